@@ -43,6 +43,7 @@ class BaselineAgent(Agent):
         self.eps_fraction = eps_fraction
         self.Q0 = Q0
         self.alpha = alpha
+        self.utility = None # Built on the first reset, then reset in place
 
     def act(self,state,explore=True,return_exploit=False):
         '''
@@ -65,7 +66,7 @@ class BaselineAgent(Agent):
 
         # Choose whether to exploit or explore
         if explore:
-            exploit = np.random.choice([True,False],p=[1-self.epsilon,self.epsilon]) # Maybe explore
+            exploit = np.random.random() < 1-self.epsilon # Maybe explore
         else:
             exploit = True # Always exploit
 
@@ -79,7 +80,7 @@ class BaselineAgent(Agent):
         else:
             # Randomly make decisions
             for node in self.action_space:
-                action[node] = np.random.choice(self.action_space[node])
+                action[node] = self.action_space[node][np.random.randint(len(self.action_space[node]))]
         if return_exploit:
             return action,exploit
         return action
@@ -92,12 +93,11 @@ class BaselineAgent(Agent):
             state - dict mapping state variable name to value
         Output:
             best_index - index of best state-action pair in utility
-            best_action - dict mapping node name to domain value of state-action pair
+            best_action - dict mapping action node name to domain value of the best action
         '''
         state_values,indices = self.score_state(state) # Score each action for the state
-        best_index = indices[np.argmax(state_values)] # Select the best scoring action index
-        best_action = self.utility.index_to_assignment(best_index) # Find corresponding action
-        return best_index,best_action
+        best = np.argmax(state_values) # Select the best scoring action
+        return indices[best],self.action_assignments[best]
 
     def learn(self,state,actions,reward):
         '''
@@ -110,22 +110,24 @@ class BaselineAgent(Agent):
         '''
         # Update trial count
         self.trial_count += 1
-        # Pack state, action and reward into a trial
-        trial = {}
-        for node in state:
-            trial[node] = state[node]
-        for node in actions:
-            trial[node] = actions[node]
-        trial["reward"] = reward
-        # Update utility with trial
-        self.utility.update(trial)
+        # Update utility at the index of the state-action pair
+        index = self.utility.assignment_to_index({**state,**actions})
+        self.utility.update_index(index,reward)
 
     def reset(self):
         '''
         Reset agent for a fresh run
         '''
         self.trial_count = 0 # Reset number of trials
-        self.utility = Utility(self.domains,self.Q0,self.alpha) # Reset utility
+        if self.utility is None:
+            self.utility = Utility(self.domains,self.Q0,self.alpha)
+            # Index offset of each possible action, so a state's action indices are its own index plus these
+            combinations = list(product(*self.action_space.values())) # All possible actions
+            keys = list(self.action_space.keys())
+            self.action_assignments = [dict(zip(keys,combination)) for combination in combinations]
+            self.action_indices = np.array([self.utility.partial_index(action) for action in self.action_assignments],dtype=int)
+        else:
+            self.utility.reset(self.Q0) # Reset utility
         self.epsilon = self.eps_start # Reset epsilon
         self.epsilon_steps = self.eps_fraction * float(self.trials) # Reset epsilon decay
 
@@ -136,20 +138,11 @@ class BaselineAgent(Agent):
         Input:
             state - dict mapping state variable names to values
         Output:
-            state_values - list of values
-            indices - list of indices corresponding to each value
+            state_values - array of values
+            indices - array of indices corresponding to each value
         '''
-        combinations = list(product(*self.action_space.values())) # All possible actions
-        keys = list(self.action_space.keys())
-        indices = []
         # Get all indices
-        for combo in combinations:
-            state_copy = state.copy()
-            for i in range(len(keys)):
-                state_copy[keys[i]] = combo[i]
-            indices.append(self.utility.assignment_to_index(state_copy))
+        indices = self.utility.partial_index(state) + self.action_indices
         # Get all values
-        state_values = []
-        for index in indices:
-            state_values.append(self.utility.values[index])
+        state_values = self.utility.values[indices]
         return state_values,indices
@@ -116,7 +116,7 @@ class BestCaseClueAgent(Agent):
                 # Select the action advised by the best expert, with probability E[rho(expert)]
                 # Ignore consensus, etc.
                 best_expert = max(self.rho, key=self.rho.get)
-                trust = np.random.choice([True,False],p=[self.rho[best_expert],1-self.rho[best_expert]])
+                trust = np.random.random() < self.rho[best_expert]
                 if trust:
                     best_action = advice_dict[best_expert]
             else:
@@ -152,7 +152,7 @@ class BestCaseClueAgent(Agent):
                     if probs[best_index]<self.threshold:
                         trust = False
                     else:
-                        trust = np.random.choice([True,False],p=[probs[best_index],1-probs[best_index]])
+                        trust = np.random.random() < probs[best_index]
                         if trust:
                             best_action = {}
                             for i in range(len(keys)):
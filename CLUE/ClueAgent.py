@@ -4,6 +4,7 @@ from StateTable import StateTable
 
 import numpy as np
 from itertools import product
+from collections import deque
 
 
 class ClueAgent(Agent):
@@ -54,6 +55,8 @@ class ClueAgent(Agent):
         '''
         self.name = "CLUE"
         self.state_space = env.state_space
+        self.state_indexer = StateTable(self.state_space) # Advice tables share the state space, so a state is indexed once for all of them
+        self.state_table_dict = {} # Advice tables, cleared and reused by reset
         self.action_space = env.action_space
         self.initial_estimate = initial_estimate
         self.no_bayes = no_bayes
@@ -108,18 +111,7 @@ class ClueAgent(Agent):
         best_action = None
 
         for expert in self.state_table_dict:
-            if self.recency is not None:
-                rho = max(self.recent_rho[expert],0) # Just in case
-                self.rho[expert] = rho
-                self.history["rho"][expert].append(rho) # Add new rho to rho history
-            else:
-                alpha = self.beta_parameters[expert][0]
-                beta = self.beta_parameters[expert][1]
-                rho = alpha/(alpha+beta)
-                rho = max(rho,0) # Just in case
-                #rho = rho**2
-                self.rho[expert] = rho
-                self.history["rho"][expert].append(rho) # Add new rho to rho history
+            self.history["rho"][expert].append(self.rho[expert]) # Add rho to rho history, kept up to date by learn
 
         base_action,exploit = self.agent.act(state,return_exploit=True)
 
@@ -132,7 +124,7 @@ class ClueAgent(Agent):
                     # Select the action advised by the best expert, with probability E[rho(expert)]
                     # Ignore consensus, etc.
                     best_expert = max(self.rho, key=self.rho.get)
-                    trust = np.random.choice([True,False],p=[self.rho[best_expert],1-self.rho[best_expert]])
+                    trust = np.random.random() < self.rho[best_expert]
                     if trust:
                         best_action = advice_dict[best_expert]
                 else:
@@ -168,7 +160,7 @@ class ClueAgent(Agent):
                         if probs[best_index]<self.threshold:
                             trust = False
                         else:
-                            trust = np.random.choice([True,False],p=[probs[best_index],1-probs[best_index]])
+                            trust = np.random.random() < probs[best_index]
                             if trust:
                                 best_action = {}
                                 for i in range(len(keys)):
@@ -191,8 +183,9 @@ class ClueAgent(Agent):
             advice_dict - dict mapping expert name to advice
         '''
         advice_dict = {}
+        index = self.state_indexer.assignment_to_index(state)
         for expert in self.state_table_dict:
-            advice = self.state_table_dict[expert].get_value(state)
+            advice = self.state_table_dict[expert].values[index]
             if advice is not None:
                 advice_dict[expert] = advice
         return advice_dict
@@ -221,44 +214,42 @@ class ClueAgent(Agent):
         # Learn
         self.agent.learn(state,actions,reward)
         # Add advice to state table
+        index = self.state_indexer.assignment_to_index(state)
+        best_val = None # Best action value of the state, only needed if some advice is evaluated
         for expert in self.state_table_dict:
             # Add advice to table
             if advice[expert] is not None:
-                self.state_table_dict[expert].add_to_table(state,advice[expert])
+                self.state_table_dict[expert].values[index] = advice[expert]
 
             # Decide between regular update or update only on receiving new advice
             if self.regular_update:
                 # Fetch the latest advice (could be this trial or earlier)
-                latest_advice = self.state_table_dict[expert].get_value(state)
+                latest_advice = self.state_table_dict[expert].values[index]
             else:
                 # Only fetch advice from this trial (could be None)
                 latest_advice = advice[expert]
 
             if latest_advice is not None: # Can update this trial
-                # Evaluate advice
-                state_values,indices = self.agent.score_state(state)
-                best_val = max(state_values)
-                worst_val = min(state_values)
+                # Evaluate advice, scoring the state once for every expert
+                if best_val is None:
+                    state_values,indices = self.agent.score_state(state)
+                    best_val = max(state_values)
+                    worst_val = min(state_values)
                 advice_state = {}
                 for node in self.state_space:
                     advice_state[node] = state[node]
                 for node in actions:
                     advice_state[node] = latest_advice[node]
                 advice_val = self.agent.utility.get_value(advice_state)
+                advice_optimal = advice_val >= best_val # Whether the expert's advice is best
                 if self.sliding_window is not None: # Only count sliding_window number of evaluations
-                    if advice_val >= best_val:
-                        self.evals[expert].append(1) # Expert's advice is best
-                    else:
-                        self.evals[expert].append(0) # Expert's advice is not optimal
-
-                    if len(self.evals[expert])>self.sliding_window:
-                        self.evals[expert] = self.evals[expert][-self.sliding_window:]
+                    self.evals[expert].append(int(advice_optimal)) # Oldest evaluation drops out once the window is full
 
-                    self.optimal_dict[expert] = np.sum(self.evals[expert])
+                    self.optimal_dict[expert] = sum(self.evals[expert])
                     self.suboptimal_dict[expert] = len(self.evals[expert])-self.optimal_dict[expert]
 
                 else: # Count all evaluations
-                    if advice_val >= best_val:
+                    if advice_optimal:
                         self.optimal_dict[expert] += 1 # Expert's advice is best
                     else:
                         self.suboptimal_dict[expert] += 1 # Expert's advice is not optimal
@@ -266,12 +257,26 @@ class ClueAgent(Agent):
                 self.beta_parameters[expert] = (self.optimal_dict[expert],self.suboptimal_dict[expert])
                 if self.recency is not None:
                     # Recency weighted moving average
-                    if advice_val >= best_val:
-                        count_update = 1
-                    else:
-                        count_update = 0
+                    count_update = int(advice_optimal)
                     self.recent_rho[expert] = (1-self.recency) * self.recent_rho[expert] + count_update * self.recency
+                self.update_rho(expert)
+
 
+    def update_rho(self,expert):
+        '''
+        Recompute the estimated reliability of an expert from its latest statistics
+        Only needed when those statistics change, rather than on every trial
+
+        Input:
+            expert - name of the expert
+        '''
+        if self.recency is not None:
+            rho = self.recent_rho[expert]
+        else:
+            alpha = self.beta_parameters[expert][0]
+            beta = self.beta_parameters[expert][1]
+            rho = alpha/(alpha+beta)
+        self.rho[expert] = max(rho,0) # Just in case
 
     def num_models(self):
         '''
@@ -292,6 +297,7 @@ class ClueAgent(Agent):
         self.agent.reset() # Reset agent
         self.trial_count = 0 # Reset number of trials
         self.history = {"rho":{}} # Reset history
+        tables = self.state_table_dict # Tables of the last run, reused rather than rebuilt
         self.state_table_dict = {} # Reset advice table
         self.beta_parameters = {} # Reset reliability estimates
         self.optimal_dict = {}
@@ -300,15 +306,19 @@ class ClueAgent(Agent):
         self.recent_rho = {}
         self.evals = {}
         for expert in panel.experts:
-            self.state_table_dict[expert] = StateTable(self.state_space)
+            if expert in tables:
+                self.state_table_dict[expert] = tables.pop(expert)
+                self.state_table_dict[expert].values.fill(None)
+            else:
+                self.state_table_dict[expert] = StateTable(self.state_space)
             self.beta_parameters[expert] = (self.initial_estimate[0],self.initial_estimate[1])
             self.optimal_dict[expert] = self.initial_estimate[0]
             self.suboptimal_dict[expert] = self.initial_estimate[1]
             self.history["rho"][expert] = []
-            self.rho[expert] = self.initial_estimate[0]/(self.initial_estimate[0]+self.initial_estimate[1])
-            self.recent_rho[expert] = self.rho[expert]
+            self.recent_rho[expert] = self.initial_estimate[0]/(self.initial_estimate[0]+self.initial_estimate[1])
+            self.update_rho(expert)
             if self.sliding_window is not None:
-                self.evals[expert] = []
+                self.evals[expert] = deque(maxlen=self.sliding_window)
 
     def takes_advice(self):
         '''
@@ -29,6 +29,8 @@ class DecayedRelianceAgent(Agent):
         '''
         self.name = "DecayedRelianceAgent"
         self.state_space = env.state_space
+        self.state_indexer = StateTable(self.state_space) # Advice tables share the state space, so a state is indexed once for all of them
+        self.state_table_dict = {} # Advice tables, cleared and reused by reset
 
         # Validation for trials
         if isinstance(trials,int) and trials > 0: # Trials is valid
@@ -90,9 +92,9 @@ class DecayedRelianceAgent(Agent):
         if len(advice_list) == 0: # No advice received thusfar, act normally
             return self.agent.act(state,explore)
         else: # Advice received for this state
-            follows_advice = np.random.choice([True,False],p=[self.reliance,1-self.reliance])
+            follows_advice = np.random.random() < self.reliance
             if follows_advice: # Follow advice
-                return np.random.choice(advice_list) # Randomly choose from given advice
+                return advice_list[np.random.randint(len(advice_list))] # Randomly choose from given advice
             else: # Act unassisted
                 return self.agent.act(state,explore)
 
@@ -106,8 +108,9 @@ class DecayedRelianceAgent(Agent):
             advice_list - list of advice, each advice is an action dict
         '''
         advice_list = []
+        index = self.state_indexer.assignment_to_index(state)
         for expert in self.state_table_dict:
-            advice = self.state_table_dict[expert].get_value(state)
+            advice = self.state_table_dict[expert].values[index]
             if advice is not None:
                 advice_list.append(advice)
         return advice_list
@@ -128,9 +131,10 @@ class DecayedRelianceAgent(Agent):
         # Learn
         self.agent.learn(state,actions,reward)
         # Add advice to state table
+        index = self.state_indexer.assignment_to_index(state)
         for expert in self.state_table_dict:
             if advice[expert] is not None:
-                self.state_table_dict[expert].add_to_table(state,advice[expert])
+                self.state_table_dict[expert].values[index] = advice[expert]
 
     def reset(self,panel):
         '''
@@ -139,9 +143,14 @@ class DecayedRelianceAgent(Agent):
         Input:
             panel - a panel of experts, instance of Panel class
         '''
+        tables = self.state_table_dict # Tables of the last run, reused rather than rebuilt
         self.state_table_dict = {}
         for expert in panel.experts:
-            self.state_table_dict[expert] = StateTable(self.state_space)
+            if expert in tables:
+                self.state_table_dict[expert] = tables.pop(expert)
+                self.state_table_dict[expert].values.fill(None)
+            else:
+                self.state_table_dict[expert] = StateTable(self.state_space)
         self.agent.reset()
         self.trial_count = 0 # Reset number of trials
         self.reliance = self.initial_reliance # Reset reliance on advice
@@ -4,6 +4,10 @@ A bunch of methods for running and facilitating experiments
 import numpy as np
 import os
 import csv
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import weakref
+from functools import partial
 
 from TruePolicyAgent import TruePolicyAgent
 from BaselineAgent import BaselineAgent
@@ -53,6 +57,13 @@ keeps_rho_history = {
     "Nonuniform CLUE":False
 }
 
+# Precision of the stored rewards and rhos
+# Single precision is ample for curves averaged over runs, and halves the memory of a long experiment
+result_dtype = np.float32
+
+# Oracles already built, keyed by the id of their environment
+oracles = weakref.WeakValueDictionary()
+
 def expert_param_test(env,agents,panel_dict,mus,gammas,trials,runs,display=False,display_interval=10):
     '''
     Run the expert parameter test
@@ -87,7 +98,7 @@ def expert_param_test(env,agents,panel_dict,mus,gammas,trials,runs,display=False
             regret[agent] = []
 
     # Initialise oracle
-    oracle = TruePolicyAgent(env)
+    oracle = get_oracle(env)
 
     # Run experiments
     for agent in agents:
@@ -114,6 +125,22 @@ def expert_param_test(env,agents,panel_dict,mus,gammas,trials,runs,display=False
     return regret
 
 
+def get_oracle(env):
+    '''
+    Return an oracle for an environment, only computing the true policy if no oracle for it is alive
+    Oracles keep no per-run state, so every agent, panel and experiment on an environment can share one
+
+    Input:
+        env - instance of InfluenceDiagram class representing environment
+    Output:
+        oracle - instance of TruePolicyAgent for env
+    '''
+    oracle = oracles.get(id(env))
+    if oracle is None or oracle.env is not env: # Ids of dead environments can be reused
+        oracle = TruePolicyAgent(env)
+        oracles[id(env)] = oracle
+    return oracle
+
 def make_agents(agent_list,env,trials,regions=None,num_regions=None,**kwargs):
     '''
     Take in a list of agent names and return a dict of agents
@@ -148,7 +175,7 @@ def make_agents(agent_list,env,trials,regions=None,num_regions=None,**kwargs):
         elif agent == "PRQ":
             agents[agent] = PRQAgent(env,trials=trials,**kwargs)
         elif agent == "True Policy Agent":
-            agents[agent] = TruePolicyAgent(env,**kwargs)
+            agents[agent] = get_oracle(env) # Acts optimally, so the shared oracle is the agent
         elif agent == "Nonuniform CLUE":
             if regions is None or num_regions is None:
                 error_message = "Must specify regions StateTable and number of regions for nonuniform CLUE"
@@ -175,7 +202,7 @@ def make_panels_nonuniform(panel_dict,env,regions,mu=10,gamma=0.01):
     Todo:
         allow for each expert in a panel to have different parameters
     '''
-    oracle = TruePolicyAgent(env) # Oracle used to retrieve best advice for each expert
+    oracle = get_oracle(env) # Oracle used to retrieve best advice for each expert
     panels = [] # List of panels
     for panel in panel_dict:
         panels.append(NonuniformPanel(env,panel,oracle,panel_dict[panel],regions,mu,gamma)) # Create nonuniform panel object
@@ -199,7 +226,7 @@ def make_panels(panel_dict,env,mu=10,gamma=0.01):
     Todo:
         allow for each expert in a panel to have different parameters
     '''
-    oracle = TruePolicyAgent(env) # Oracle used to retrieve best advice for each expert
+    oracle = get_oracle(env) # Oracle used to retrieve best advice for each expert
     panels = [] # List of panels
     for panel in panel_dict:
         panels.append(Panel(env,panel,oracle,panel_dict[panel],mu,gamma)) # Create Panel object
@@ -233,23 +260,23 @@ def make_panel_comparison_dicts(agents,panels,trials,runs):
             if agents[agent].get_history() is not None: # Agent keeps track of rhos
                 rhos[agent] = {}
             for panel in panels:
-                rewards[agent][panel.name] = np.zeros((runs,trials))
+                rewards[agent][panel.name] = np.zeros((runs,trials),dtype=result_dtype)
                 if agents[agent].get_history() is not None:
                     rhos[agent][panel.name] = {}
                     for expert in panel.experts:
                         if agents[agent].num_models() == 1:
-                            rhos[agent][panel.name][expert] = np.zeros((runs,trials))
+                            rhos[agent][panel.name][expert] = np.zeros((runs,trials),dtype=result_dtype)
                         else:
                             rhos[agent][panel.name][expert] = []
                             for i in range(agents[agent].num_models()):
-                                rhos[agent][panel.name][expert].append(np.zeros((runs,trials)))
+                                rhos[agent][panel.name][expert].append(np.zeros((runs,trials),dtype=result_dtype))
                             
 
         else:
-            rewards[agent] = np.zeros((runs,trials))
+            rewards[agent] = np.zeros((runs,trials),dtype=result_dtype)
     return rewards,rhos
 
-def panel_comparison(env,agents,panels,trials,runs,display=False,display_interval=10):
+def panel_comparison(env,agents,panels,trials,runs,display=False,display_interval=10,processes=1):
     '''
     Run an experiment comparing rewards obtained over trials by each agent-panel configuration
 
@@ -261,6 +288,10 @@ def panel_comparison(env,agents,panels,trials,runs,display=False,display_interva
         runs - number of runs over which rewards will be averaged
         display - boolean. Whether or not the experiment will print out updates
         display_interval - if display = True, this determines the number of runs between printouts
+        processes - number of worker processes the runs are spread across
+            with more than 1, each run is seeded separately (see run_seeded), so results
+            are reproducible for any number of processes but differ from a serial experiment
+            default: 1
 
     Output:
         rewards - dict for storing rewards
@@ -272,16 +303,25 @@ def panel_comparison(env,agents,panels,trials,runs,display=False,display_interva
     '''
     # Initialise reward and rho dicts
     rewards,rhos = make_panel_comparison_dicts(agents,panels,trials,runs)
+    if processes > 1:
+        executor = ProcessPoolExecutor(max_workers=processes,mp_context=multiprocessing.get_context("fork"))
+        results = start_seeded_runs(executor,env,agents,panels,trials,runs)
+    else:
+        executor = None
+        results = None
     for agent in agents:
         if agents[agent].takes_advice(): # Panels matter
-            for panel in panels:
+            for panel_index,panel in enumerate(panels):
                 if display:
                     print("==="+agent+" : "+panel.name+"===")
                 for r in range(runs):
                     if display and r % display_interval == 0:
                         print("Run "+str(r))
-                    rewards[agent][panel.name][r,:] = run_panel(env,agents[agent],panel,trials)
-                    history = agents[agent].get_history()
+                    if results is None:
+                        run_panel(env,agents[agent],panel,trials,rewards[agent][panel.name][r]) # Written in place
+                        history = agents[agent].get_history()
+                    else:
+                        rewards[agent][panel.name][r,:],history = next(results)
                     if history is not None:
                         for expert in panel.experts:
                             if agents[agent].num_models() == 1:
@@ -296,9 +336,82 @@ def panel_comparison(env,agents,panels,trials,runs,display=False,display_interva
             for r in range(runs):
                 if display and r % display_interval == 0:
                     print("Run "+str(r))
-                rewards[agent][r,:] = run_standard(env,agents[agent],trials)
+                if results is None:
+                    run_standard(env,agents[agent],trials,rewards[agent][r]) # Written in place
+                else:
+                    rewards[agent][r,:],_ = next(results)
+    if executor is not None:
+        executor.shutdown()
     return rewards,rhos
 
+# Environment, agents, panels and trials of the panel comparison whose runs are being started
+# Forked workers inherit them, so they are not pickled for every run
+seeded_runs_experiment = None
+
+def start_seeded_runs(executor,env,agents,panels,trials,runs):
+    '''
+    Start every run of a panel comparison on the executor's worker processes
+    Each run gets its own seed, drawn in turn from the global generator
+
+    Input:
+        executor - ProcessPoolExecutor whose workers are forked
+        env - instance of InfluenceDiagram representing environment
+        agents - dict mapping agent name to Agent object
+        panels - list of Panel objects
+        trials - number of trials for each run
+        runs - number of runs for each agent-panel configuration
+    Output:
+        results - iterator over the (rewards,history) of each run, in the order panel_comparison performs them
+    '''
+    global seeded_runs_experiment
+    agent_names = []
+    panel_indices = []
+    for agent in agents:
+        if agents[agent].takes_advice():
+            for panel_index in range(len(panels)):
+                agent_names += [agent]*runs
+                panel_indices += [panel_index]*runs
+        else:
+            agent_names += [agent]*runs
+            panel_indices += [None]*runs
+    seeds = np.random.randint(2**31,size=len(agent_names)).tolist()
+    seeded_runs_experiment = (env,agents,panels,trials)
+    return executor.map(run_seeded,agent_names,panel_indices,seeds)
+
+def run_seeded(agent,panel_index,seed):
+    '''
+    Perform one run of the panel comparison started by start_seeded_runs, after seeding the global generator
+
+    Input:
+        agent - name of the agent
+        panel_index - index of the panel in the list of panels, None if the agent does not take advice
+        seed - the random seed for this run
+    Output:
+        rewards - array of rewards obtained this run. length = trials
+        history - the agent's history at the end of the run, None if it does not take advice
+    '''
+    env,agents,panels,trials = seeded_runs_experiment
+    np.random.seed(seed)
+    if panel_index is None:
+        return run_standard(env,agents[agent],trials),None
+    rewards = run_panel(env,agents[agent],panels[panel_index],trials)
+    return rewards,pack_history(agents[agent].get_history())
+
+def pack_history(history):
+    '''
+    Convert the rho history of a run into arrays of result_dtype, to be sent back from a worker process
+    An array pickles as a single buffer, rather than one object per trial
+
+    Input:
+        history - an agent's history dict, or None
+    Output:
+        history - dict mapping "rho" to a dict mapping expert name to array of rhos, or None
+            one row per region for agents with several models of each expert
+    '''
+    if history is None:
+        return None
+    return {"rho":{expert:np.asarray(rho,dtype=result_dtype) for expert,rho in history["rho"].items()}}
+
 def panel_comparison_partially_reliable_experts(env,agent_list,panel_dict,trials,runs,display=False,display_interval=10):
     '''
     Run an experiment comparing rewards obtained over trials by each agent-panel configuration
@@ -319,13 +432,13 @@ def panel_comparison_partially_reliable_experts(env,agent_list,panel_dict,trials
             if keeps_rho_history[agent]: # Agent keeps track of rhos
                 rhos[agent] = {}
             for panel in panel_dict:
-                rewards[agent][panel] = np.zeros((runs,trials))
+                rewards[agent][panel] = np.zeros((runs,trials),dtype=result_dtype)
                 if keeps_rho_history[agent]:
                     rhos[agent][panel] = {}
                     for expert in panel_dict[panel]:
-                        rhos[agent][panel][str(expert)] = np.zeros((runs,trials))
+                        rhos[agent][panel][str(expert)] = np.zeros((runs,trials),dtype=result_dtype)
         else:
-            rewards[agent] = np.zeros((runs,trials))
+            rewards[agent] = np.zeros((runs,trials),dtype=result_dtype)
     # Initialise agents
     agents = make_agents(agent_list,env,trials)
     # Run experiment
@@ -344,16 +457,16 @@ def panel_comparison_partially_reliable_experts(env,agent_list,panel_dict,trials
         for agent in agents:
             if agents[agent].takes_advice(): # Panels have an effect
                 for panel in panels:
-                    rewards[agent][panel.name][r,:] = run_panel(env,agents[agent],panel,trials)
+                    run_panel(env,agents[agent],panel,trials,rewards[agent][panel.name][r]) # Written in place
                     history = agents[agent].get_history()
                     if history is not None:
                         for expert in panel.experts:
                             rhos[agent][panel.name][expert][r,:] = history["rho"][expert]
             else: # Panels don't matter
-                rewards[agent][r,:] = run_standard(env,agents[agent],trials)
+                run_standard(env,agents[agent],trials,rewards[agent][r]) # Written in place
     return rewards,rhos
 
-def panel_comparison_random_envs(agent_list,panel_dict,trials,runs,display=False,display_interval=10,num_chance=10,num_decision=3,**kwargs):
+def panel_comparison_random_envs(agent_list,panel_dict,trials,runs,display=False,display_interval=10,num_chance=10,num_decision=3,processes=1,**kwargs):
     '''
     Run an experiment comparing rewards obtained over trials by each agent-panel configuration
     Each run on a different randomly generated environment
@@ -371,6 +484,9 @@ def panel_comparison_random_envs(agent_list,panel_dict,trials,runs,display=False
             default: 10
         num_decision - number of action variables
             default: 3
+        processes - number of worker processes the runs are spread across
+            runs are seeded by their index, so results do not depend on this
+            default: 1
     '''
     # Initialise empty dicts for rewards and rho
     rewards = {}
@@ -382,36 +498,83 @@ def panel_comparison_random_envs(agent_list,panel_dict,trials,runs,display=False
             if keeps_rho_history[agent]: # Agent keeps track of rhos
                 rhos[agent] = {}
             for panel in panel_dict:
-                rewards[agent][panel] = np.zeros((runs,trials))
+                rewards[agent][panel] = np.zeros((runs,trials),dtype=result_dtype)
                 if keeps_rho_history[agent]:
                     rhos[agent][panel] = {}
                     for expert in panel_dict[panel]:
-                        rhos[agent][panel][str(expert)] = np.zeros((runs,trials))
+                        rhos[agent][panel][str(expert)] = np.zeros((runs,trials),dtype=result_dtype)
         else:
-            rewards[agent] = np.zeros((runs,trials))
+            rewards[agent] = np.zeros((runs,trials),dtype=result_dtype)
     # Run experiment
-    for r in range(runs):
+    run = partial(run_random_env,agent_list=agent_list,panel_dict=panel_dict,trials=trials,num_chance=num_chance,num_decision=num_decision,**kwargs)
+    if processes > 1:
+        # Forked workers inherit the loaded modules, so experiment scripts need no main guard
+        executor = ProcessPoolExecutor(max_workers=processes,mp_context=multiprocessing.get_context("fork"))
+        results = executor.map(run,range(runs))
+    else:
+        executor = None
+        results = map(run,range(runs))
+    for r,(run_rewards,run_rhos) in enumerate(results):
         if display and r % display_interval == 0:
             print("Run "+str(r))
-        # Initialise environment
-        env = RandomSSDP(num_chance=num_chance,num_decision=num_decision,seed=r)
-        # Initialise agents
-        agents = make_agents(agent_list,env,trials,**kwargs)
-        # Initialise panels
-        panels = make_panels(panel_dict,env)
-        # Run
-        for agent in agents:
-            if agents[agent].takes_advice(): # Panels have an effect
-                for panel in panels:
-                    rewards[agent][panel.name][r,:] = run_panel(env,agents[agent],panel,trials)
-                    history = agents[agent].get_history()
-                    if history is not None:
-                        for expert in panel.experts:
-                            rhos[agent][panel.name][expert][r,:] = history["rho"][expert]
-            else: # Panels don't matter
-                rewards[agent][r,:] = run_standard(env,agents[agent],trials)
+        for agent in run_rewards:
+            if takes_advice[agent]:
+                for panel in run_rewards[agent]:
+                    rewards[agent][panel][r,:] = run_rewards[agent][panel]
+                    if agent in run_rhos:
+                        for expert in run_rhos[agent][panel]:
+                            rhos[agent][panel][expert][r,:] = run_rhos[agent][panel][expert]
+            else:
+                rewards[agent][r,:] = run_rewards[agent]
+    if executor is not None:
+        executor.shutdown()
     return rewards,rhos
 
+def run_random_env(seed,agent_list,panel_dict,trials,num_chance=10,num_decision=3,**kwargs):
+    '''
+    Perform a single run of panel_comparison_random_envs on a randomly generated environment
+    Each run only depends on its seed, so runs can be carried out in separate processes
+
+    Input:
+        seed - the random seed used to generate the environment
+        agent_list - list of agent names, used to generate agents (see make_agents in __init__.py)
+        panel_dict - dict mapping panel names to list of reliabilities
+        trials - number of trials for the run
+        num_chance - number of state variables
+            default: 10
+        num_decision - number of action variables
+            default: 3
+    Output:
+        run_rewards - dict for storing rewards of this run
+            if agent takes advice, run_rewards[agent][panel] = array of length trials
+            otherwise, run_rewards[agent] = array of length trials
+        run_rhos - dict for storing rhos of this run
+            if agent stores rhos, run_rhos[agent][panel][expert] = list of length trials
+            otherwise, run_rhos[agent] is not specified
+    '''
+    # Initialise environment
+    env = RandomSSDP(num_chance=num_chance,num_decision=num_decision,seed=seed)
+    # Initialise agents
+    agents = make_agents(agent_list,env,trials,**kwargs)
+    # Initialise panels
+    panels = make_panels(panel_dict,env)
+    # Run
+    run_rewards = {}
+    run_rhos = {}
+    for agent in agents:
+        if agents[agent].takes_advice(): # Panels have an effect
+            run_rewards[agent] = {}
+            for panel in panels:
+                run_rewards[agent][panel.name] = run_panel(env,agents[agent],panel,trials)
+                history = agents[agent].get_history()
+                if history is not None:
+                    if agent not in run_rhos:
+                        run_rhos[agent] = {}
+                    run_rhos[agent][panel.name] = pack_history(history)["rho"]
+        else: # Panels don't matter
+            run_rewards[agent] = run_standard(env,agents[agent],trials)
+    return run_rewards,run_rhos
+
 def regret_test(env,agents,panels,trials,runs,display=False,display_interval=10):
     '''
     Run each agent and stores regret
@@ -439,7 +602,7 @@ def regret_test(env,agents,panels,trials,runs,display=False,display_interval=10)
             regret[agent] = []
 
     # Initialise oracle
-    oracle = TruePolicyAgent(env)
+    oracle = get_oracle(env)
 
     # Run experiments
     for agent in agents:
@@ -463,7 +626,7 @@ def regret_test(env,agents,panels,trials,runs,display=False,display_interval=10)
     return regret
 
 
-def run_panel(env,agent,panel,trials):
+def run_panel(env,agent,panel,trials,rewards=None):
     '''
     Perform one SSDP learning session with a single agent and a panel of experts
 
@@ -472,19 +635,25 @@ def run_panel(env,agent,panel,trials):
         agent - instance of Agent
         panel - instance of Panel
         trials - number of trials
+        rewards - array of length trials that rewards are written into, e.g. a row of an experiment's results
+            a new array is allocated if None
+            default: None
     Output:
-        rewards - list of rewards obtained this run. length = trials
+        rewards - array of rewards obtained this run. length = trials
     '''
-    rewards = [] # Empty list of rewards
+    if rewards is None:
+        rewards = np.zeros(trials,dtype=result_dtype) # Preallocated rewards for each trial
     agent.reset(panel) # Reset agent to forget any older training
     panel.reset() # Reset each expert in the panel
+    # The environment, agent and panel are fixed for the run, so look up their methods once
+    reset,act,step,advise,learn = env.reset,agent.act,env.step,panel.advise,agent.learn
     for i in range(trials): # Loop through each trial
-        state = env.reset() # Reset the environment to an empty state, then sample initial observations
-        action = agent.act(state) # Compute the action to take
-        reward = env.step(action) # Feed action to environment, get reward
-        advice = panel.advise(state,action,reward) # Each expert may or may not advise the agent
-        agent.learn(state,action,reward,advice) # Perform some learning
-        rewards.append(reward) # Add reward to list
+        state = reset() # Reset the environment to an empty state, then sample initial observations
+        action = act(state) # Compute the action to take
+        reward = step(action) # Feed action to environment, get reward
+        advice = advise(state,action,reward) # Each expert may or may not advise the agent
+        learn(state,action,reward,advice) # Perform some learning
+        rewards[i] = reward # Store reward for this trial
     return rewards
 
 def run_panel_regret(env,agent,panel,trials,oracle):
@@ -501,21 +670,25 @@ def run_panel_regret(env,agent,panel,trials,oracle):
     Output:
         regret - regret accumulated this run
     '''
-    regret = 0
+    rewards = np.zeros(trials) # Rewards obtained by the agent
+    oracle_rewards = np.zeros(trials) # Expected rewards of the optimal actions
     agent.reset(panel) # Reset agent to forget any older training
     panel.reset() # Reset each expert in the panel
+    # The environment, agent and panel are fixed for the run, so look up their methods once
+    reset,act,step,advise,learn = env.reset,agent.act,env.step,panel.advise,agent.learn
     for i in range(trials): # Loop through each trial
-        state = env.reset() # Reset the environment to an empty state, then sample initial observations
-        action = agent.act(state) # Compute the action to take
-        reward = env.step(action) # Feed action to environment, get reward
-        advice = panel.advise(state,action,reward) # Each expert may or may not advise the agent
-        agent.learn(state,action,reward,advice) # Perform some learning
+        state = reset() # Reset the environment to an empty state, then sample initial observations
+        action = act(state) # Compute the action to take
+        reward = step(action) # Feed action to environment, get reward
+        advice = advise(state,action,reward) # Each expert may or may not advise the agent
+        learn(state,action,reward,advice) # Perform some learning
         oracle_action = oracle.act(state) # Get optimal action
-        oracle_reward = oracle.expected_utility(state,oracle_action) # Get max reward
-        regret += oracle_reward - reward # Calculate regret, add to running total
+        oracle_rewards[i] = oracle.expected_utility(state,oracle_action) # Get max reward
+        rewards[i] = reward # Store reward for this trial
+    regret = np.sum(oracle_rewards - rewards) # Total regret over the run
     return regret
 
-def run_standard(env,agent,trials):
+def run_standard(env,agent,trials,rewards=None):
     '''
     Perform one SSDP learning session with a single agent and no experts
 
@@ -523,17 +696,23 @@ def run_standard(env,agent,trials):
         env - instance of InfluenceDiagram representing environment
         agent - instance of Agent
         trials - number of trials
+        rewards - array of length trials that rewards are written into, e.g. a row of an experiment's results
+            a new array is allocated if None
+            default: None
     Output:
-        rewards - list of rewards obtained this run. length = trials
+        rewards - array of rewards obtained this run. length = trials
     '''
-    rewards = [] # Empty list of rewards
+    if rewards is None:
+        rewards = np.zeros(trials,dtype=result_dtype) # Preallocated rewards for each trial
     agent.reset() # Reset agent to forget any older training
+    # The environment and agent are fixed for the run, so look up their methods once
+    reset,act,step,learn = env.reset,agent.act,env.step,agent.learn
     for i in range(trials): # Loop through each trial
-        state = env.reset() # Reset the environment to an empty state, then sample initial observations
-        action = agent.act(state) # Compute the action to take
-        reward = env.step(action) # Feed action to environment, get reward
-        agent.learn(state,action,reward) # Perform any learning
-        rewards.append(reward) # Add reward to list
+        state = reset() # Reset the environment to an empty state, then sample initial observations
+        action = act(state) # Compute the action to take
+        reward = step(action) # Feed action to environment, get reward
+        learn(state,action,reward) # Perform any learning
+        rewards[i] = reward # Store reward for this trial
     return rewards
 
 def run_standard_regret(env,agent,trials,oracle):
@@ -548,16 +727,20 @@ def run_standard_regret(env,agent,trials,oracle):
     Output:
         regret - regret accumulated this run
     '''
-    regret = 0
+    rewards = np.zeros(trials) # Rewards obtained by the agent
+    oracle_rewards = np.zeros(trials) # Expected rewards of the optimal actions
     agent.reset() # Reset agent to forget any older training
+    # The environment and agent are fixed for the run, so look up their methods once
+    reset,act,step,learn = env.reset,agent.act,env.step,agent.learn
     for i in range(trials): # Loop through each trial
-        state = env.reset() # Reset the environment to an empty state, then sample initial observations
-        action = agent.act(state) # Compute the action to take
-        reward = env.step(action) # Feed action to environment, get reward
-        agent.learn(state,action,reward) # Perform any learning
+        state = reset() # Reset the environment to an empty state, then sample initial observations
+        action = act(state) # Compute the action to take
+        reward = step(action) # Feed action to environment, get reward
+        learn(state,action,reward) # Perform any learning
         oracle_action = oracle.act(state) # Get optimal action
-        oracle_reward = oracle.expected_utility(state,oracle_action) # Get max reward
-        regret += oracle_reward - reward # Calculate regret, add to running total
+        oracle_rewards[i] = oracle.expected_utility(state,oracle_action) # Get max reward
+        rewards[i] = reward # Store reward for this trial
+    regret = np.sum(oracle_rewards - rewards) # Total regret over the run
     return regret
 
 def save_beta_param_test_to_csv(regrets,env_name,agents,panels,trials,runs,baseline="Baseline Agent",directory="beta_param_test"):
@@ -599,27 +782,41 @@ def save_expert_param_test_to_csv(regrets,env_name,agents,panel_dict,trials,runs
             writer.writerow(row+regrets[agent])
     f.close()
 
-def save_panel_comparison_to_csv(rewards,rhos,env_name,agents,panels,trials,runs,directory="panel_comparison"):
+def save_runs(path,header,values,file_format="csv"):
+    '''
+    Save the results of one agent-panel configuration, one row per run
+
+    Input:
+        path - path of the file, without extension
+        header - list of header fields, identifying the agent, panel and so on
+        values - 2D array, one row per run
+        file_format - "csv", or "npz" for a compressed numpy archive
+            default: "csv"
+    '''
+    if file_format == "csv":
+        f = open(path+".csv","w",newline="")
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(values)
+        f.close()
+    elif file_format == "npz":
+        header = np.array(["" if field is None else str(field) for field in header]) # Same fields as the csv header
+        np.savez_compressed(path+".npz",header=header,runs=values)
+    else:
+        error_message = "Invalid file format: "+str(file_format)
+        raise Exception(error_message)
+
+def save_panel_comparison(rewards,rhos,env_name,agents,panels,trials,runs,directory="panel_comparison",file_format="csv"):
     base_dir = "results/"+env_name+"/"+directory+"/"+str(trials)+"_trials_"+str(runs)+"_runs/"
     file_dir = base_dir+"rewards/"
     os.makedirs(os.path.dirname(file_dir), exist_ok=True)
     for agent in agents:
         if agents[agent].takes_advice():
             for panel in panels:
-                f = open(file_dir+agent+"_"+panel.name+".csv","w",newline="")
-                writer = csv.writer(f)
-                writer.writerow([agent,panel.name])
-                for run in range(runs):
-                    writer.writerow(rewards[agent][panel.name][run,:])
-                f.close()
+                save_runs(file_dir+agent+"__"+panel.name,[agent,panel.name],rewards[agent][panel.name],file_format)
         else:
-            f = open(file_dir+agent+".csv","w",newline="")
-            writer = csv.writer(f)
-            writer.writerow([agent,None])
-            for run in range(runs):
-                writer.writerow(rewards[agent][run,:])
-            f.close()
-    print("Saving rhos to csv...")
+            save_runs(file_dir+agent,[agent,None],rewards[agent],file_format)
+    print("Saving rhos to "+file_format+"...")
     file_dir = base_dir+"rhos/"
     os.makedirs(os.path.dirname(file_dir), exist_ok=True)
     for agent in agents:
@@ -627,53 +824,40 @@ def save_panel_comparison_to_csv(rewards,rhos,env_name,agents,panels,trials,runs
             for panel in panels:
                 for expert in panel.experts:
                     if agents[agent].num_models() == 1:
-                        f = open(file_dir+agent+"_"+panel.name+"_"+expert+".csv","w",newline="")
-                        writer = csv.writer(f)
-                        writer.writerow([agent,panel.name,expert])
-                        for run in range(runs):
-                            writer.writerow(rhos[agent][panel.name][expert][run,:])
-                        f.close()
+                        save_runs(file_dir+agent+"_"+panel.name+"_"+expert,[agent,panel.name,expert],rhos[agent][panel.name][expert],file_format)
                     else:
                         for i in range(agents[agent].num_models()):
-                            f = open("{}{}_{}_{}_{}.csv".format(file_dir,agent,panel.name,expert,str(i)),"w",newline="")
-                            writer = csv.writer(f)
-                            writer.writerow([agent,panel.name,expert,str(i)])
-                            for run in range(runs):
-                                writer.writerow(rhos[agent][panel.name][expert][i][run,:])
-                            f.close()
+                            save_runs("{}{}_{}_{}_{}".format(file_dir,agent,panel.name,expert,str(i)),[agent,panel.name,expert,str(i)],rhos[agent][panel.name][expert][i],file_format)
 
-def save_panel_comparison_random_envs_to_csv(rewards,rhos,num_chance,num_decision,agent_list,panel_dict,trials,runs,directory):
+def save_panel_comparison_to_csv(rewards,rhos,env_name,agents,panels,trials,runs,directory="panel_comparison"):
+    save_panel_comparison(rewards,rhos,env_name,agents,panels,trials,runs,directory,file_format="csv")
+
+def save_panel_comparison_to_npz(rewards,rhos,env_name,agents,panels,trials,runs,directory="panel_comparison"):
+    save_panel_comparison(rewards,rhos,env_name,agents,panels,trials,runs,directory,file_format="npz")
+
+def save_panel_comparison_random_envs(rewards,rhos,num_chance,num_decision,agent_list,panel_dict,trials,runs,directory,file_format="csv"):
     env_name = "Random ("+str(num_chance)+","+str(num_decision)+")"
     base_dir = "results/"+env_name+"/"+directory+"/"+str(trials)+"_trials_"+str(runs)+"_runs/"
-    print("Saving rewards to csv...")
+    print("Saving rewards to "+file_format+"...")
     file_dir = base_dir+"rewards/"
     os.makedirs(os.path.dirname(file_dir), exist_ok=True)
     for agent in agent_list:
         if takes_advice[agent]:
             for panel in panel_dict:
-                f = open(file_dir+agent+"_"+panel+".csv","w",newline="")
-                writer = csv.writer(f)
-                writer.writerow([agent,panel])
-                for run in range(runs):
-                    writer.writerow(rewards[agent][panel][run,:])
-                f.close()
+                save_runs(file_dir+agent+"__"+panel,[agent,panel],rewards[agent][panel],file_format)
         else:
-            f = open(file_dir+agent+".csv","w",newline="")
-            writer = csv.writer(f)
-            writer.writerow([agent,None])
-            for run in range(runs):
-                writer.writerow(rewards[agent][run,:])
-            f.close()
-    print("Saving rhos to csv...")
+            save_runs(file_dir+agent,[agent,None],rewards[agent],file_format)
+    print("Saving rhos to "+file_format+"...")
     file_dir = base_dir+"rhos/"
     os.makedirs(os.path.dirname(file_dir), exist_ok=True)
     for agent in agent_list:
         if keeps_rho_history[agent]:
             for panel in panel_dict:
                 for expert in panel_dict[panel]:
-                    f = open(file_dir+agent+"_"+panel+"_"+str(expert)+".csv","w",newline="")
-                    writer = csv.writer(f)
-                    writer.writerow([agent,panel,expert])
-                    for run in range(runs):
-                        writer.writerow(rhos[agent][panel][str(expert)][run,:])
-                    f.close()
+                    save_runs(file_dir+agent+"_"+panel+"_"+str(expert),[agent,panel,expert],rhos[agent][panel][str(expert)],file_format)
+
+def save_panel_comparison_random_envs_to_csv(rewards,rhos,num_chance,num_decision,agent_list,panel_dict,trials,runs,directory):
+    save_panel_comparison_random_envs(rewards,rhos,num_chance,num_decision,agent_list,panel_dict,trials,runs,directory,file_format="csv")
+
+def save_panel_comparison_random_envs_to_npz(rewards,rhos,num_chance,num_decision,agent_list,panel_dict,trials,runs,directory):
+    save_panel_comparison_random_envs(rewards,rhos,num_chance,num_decision,agent_list,panel_dict,trials,runs,directory,file_format="npz")
@@ -3,6 +3,7 @@ Parent class for any SSDP influence diagram environment
 '''
 
 import numpy as np
+from operator import itemgetter
 import PGM
 import StateTable
 
@@ -30,6 +31,22 @@ class InfluenceDiagram():
         self.decision = list(self.action_space.keys()) # Decision variables
         self.nodes = self.chance+self.decision # All nodes
 
+        # Hashable keys of a state or action's values in node order, used by caches
+        # A single node gives its value rather than a 1-tuple
+        self.state_key = itemgetter(*self.chance)
+        self.action_key = itemgetter(*self.decision)
+
+        # Cumulative distributions of each chance node, one row per assignment to its parents
+        # The CPDs are fixed, so sampling only needs a uniform draw and a search of one row
+        self.samplers = {}
+        for node in self.chance:
+            factor = self.factors[node]
+            num_values = factor.child.size
+            cdfs = np.asarray(factor.values,dtype=float).reshape(-1,num_values).cumsum(axis=1)
+            cdfs /= cdfs[:,-1:] # Normalised as np.random.choice does
+            row_offsets = [(var,factor.var_offsets[var]//num_values) for var in factor.parents]
+            self.samplers[node] = (row_offsets,cdfs,np.array(factor.child.domain))
+
         # Initialise dictionary of node types
         self.node_types = {}
         for node in self.chance:
@@ -49,6 +66,10 @@ class InfluenceDiagram():
         self.size_A = None
         self.size()
 
+        # Policy and utility tables already computed by prune_state_nodes, by set of pruned nodes
+        # The environment is fixed, so experts hiding the same nodes can share them
+        self.pruned_tables = {}
+
     def __str__(self):
         '''
         Print details of environment
@@ -108,6 +129,10 @@ class InfluenceDiagram():
                 and each state assignment maps to an action assignment
             utility - StateTable object mapping state-action assignments to expected utilities
         '''
+        key = frozenset(state_nodes)
+        if key in self.pruned_tables:
+            return self.pruned_tables[key]
+
         # Get list of all factors
         fac_list = list(self.factors.values())
 
@@ -151,6 +176,7 @@ class InfluenceDiagram():
                     best_action = action_assignment
                     best_reward = reward
             policy.add_to_table(assignment,best_action)
+        self.pruned_tables[key] = (policy,utility)
         return policy,utility
 
     def reset(self):
@@ -169,12 +195,39 @@ class InfluenceDiagram():
             state - a dict mapping node name to value in node domain, represents current state
         '''
         for node in self.chance:
-            distribution = self.factors[node].cond_dist(self.state_vars) # Fetch conditional distribution on parents in assignment
-            value = np.random.choice(list(distribution.keys()),p=list(distribution.values())) # Chose a value with probability
+            row_offsets,cdfs,values = self.samplers[node]
+            row = 0 # Row of the conditional distribution on parents in assignment
+            for var,offset in row_offsets:
+                row += var.val_to_index[self.state_vars[var]]*offset
+            value = values[cdfs[row].searchsorted(np.random.random(),side="right")] # Chose a value with probability, same draw as np.random.choice
             self.state[node] = value # Set variable in current state
             self.state_vars[self.variables[node]] = value # Set variable in current state
         return self.state
 
+    def sample_batch(self,num_states):
+        '''
+        Samples many independent assignments of state variables at once, for use with the
+        batch methods of agents and experts (e.g. act_batch, advise_batch)
+        Each node is sampled for every state with one draw of uniforms, so the states differ
+        from those the same number of calls to sample would give
+
+        Input:
+            num_states - the number of states to sample
+        Output:
+            states - list of dicts mapping node name to value in node domain
+        '''
+        value_indices = {} # Position in its domain of each node's value, for every state
+        columns = []
+        for node in self.chance:
+            row_offsets,cdfs,values = self.samplers[node]
+            rows = np.zeros(num_states,dtype=int) # Row of the conditional distribution for every state
+            for var,offset in row_offsets:
+                rows += value_indices[var.name]*offset
+            uniforms = np.random.random(num_states)
+            value_indices[node] = (cdfs[rows] <= uniforms[:,None]).sum(axis=1) # Same as searchsorted with side="right"
+            columns.append(values[value_indices[node]])
+        return [dict(zip(self.chance,column_values)) for column_values in zip(*columns)]
+
     def size(self):
         '''
         Returns the size of the environment
@@ -55,7 +55,7 @@ class LinUCBAgent(Agent):
         max_ucb = -1
         ucbs = self.UCB(state)
         max_arms = np.argwhere(ucbs == np.amax(ucbs)).flatten().tolist()
-        action_index = np.random.choice(max_arms)
+        action_index = max_arms[np.random.randint(len(max_arms))]
         return self.index_to_action(action_index)
 
     def action_to_index(self,action):
@@ -25,6 +25,8 @@ class NaiveAdviceFollower(Agent):
         '''
         self.name = "NAF"
         self.state_space = env.state_space
+        self.state_indexer = StateTable(self.state_space) # Advice tables share the state space, so a state is indexed once for all of them
+        self.state_table_dict = {} # Advice tables, cleared and reused by reset
         if agent is None: # Default agent
             if isinstance(trials,int) and trials > 0: # Trials is valid
                 self.agent = BaselineAgent(env,trials)
@@ -54,7 +56,7 @@ class NaiveAdviceFollower(Agent):
         if len(advice_list) == 0: # No advice received thusfar, act normally
             return self.agent.act(state)
         else: # Advice received for this state
-            return np.random.choice(advice_list) # Randomly choose from given advice
+            return advice_list[np.random.randint(len(advice_list))] # Randomly choose from given advice
 
     def aggregate_advice(self,state):
         '''
@@ -66,8 +68,9 @@ class NaiveAdviceFollower(Agent):
             advice_list - list of advice, each advice is an action dict
         '''
         advice_list = []
+        index = self.state_indexer.assignment_to_index(state)
         for expert in self.state_table_dict:
-            advice = self.state_table_dict[expert].get_value(state)
+            advice = self.state_table_dict[expert].values[index]
             if advice is not None:
                 advice_list.append(advice)
         return advice_list
@@ -86,9 +89,10 @@ class NaiveAdviceFollower(Agent):
         # Learn
         self.agent.learn(state,actions,reward)
         # Add advice to state table
+        index = self.state_indexer.assignment_to_index(state)
         for expert in self.state_table_dict:
             if advice[expert] is not None:
-                self.state_table_dict[expert].add_to_table(state,advice[expert])
+                self.state_table_dict[expert].values[index] = advice[expert]
 
     def reset(self,panel):
         '''
@@ -97,9 +101,14 @@ class NaiveAdviceFollower(Agent):
         Input:
             panel - a panel of experts, instance of Panel class
         '''
+        tables = self.state_table_dict # Tables of the last run, reused rather than rebuilt
         self.state_table_dict = {}
         for expert in panel.experts:
-            self.state_table_dict[expert] = StateTable(self.state_space)
+            if expert in tables:
+                self.state_table_dict[expert] = tables.pop(expert)
+                self.state_table_dict[expert].values.fill(None)
+            else:
+                self.state_table_dict[expert] = StateTable(self.state_space)
         self.agent.reset()
 
     def takes_advice(self):
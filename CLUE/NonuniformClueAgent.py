@@ -4,6 +4,7 @@ from StateTable import StateTable
 
 import numpy as np
 from itertools import product
+from collections import deque
 
 
 class NonuniformClueAgent(Agent):
@@ -57,6 +58,8 @@ class NonuniformClueAgent(Agent):
         '''
         self.name = "Nonuniform CLUE"
         self.state_space = env.state_space
+        self.state_indexer = StateTable(self.state_space) # Advice tables share the state space, so a state is indexed once for all of them
+        self.state_table_dict = {} # Advice tables, cleared and reused by reset
         self.action_space = env.action_space
         self.initial_estimate = initial_estimate
         self.no_bayes = no_bayes
@@ -64,6 +67,8 @@ class NonuniformClueAgent(Agent):
         self.recency = recency
         self.regions = regions
         self.num_regions = num_regions
+        # Region of every state by its index in the state space, so each trial's region is read with the index it already needs
+        self.state_regions = regions.values[[regions.assignment_to_index(self.state_indexer.index_to_assignment(i)) for i in range(self.state_indexer.size)]]
 
         self.trials = trials
 
@@ -108,25 +113,15 @@ class NonuniformClueAgent(Agent):
         '''
 
         # Check if agent has been advised previously
-        advice_dict = self.aggregate_advice(state)
+        index = self.state_indexer.assignment_to_index(state)
+        advice_dict = self.aggregate_advice(state,index)
         advice_given = bool(advice_dict)
         best_action = None
-        region = self.regions.get_value(state)
+        region = self.state_regions[index]
 
         for expert in self.state_table_dict:
-            if self.recency is not None:
-                for i in range(self.num_regions):
-                    rho = max(self.recent_rho[expert][i],0) # Just in case
-                    self.rho[expert][i] = rho
-                    self.history["rho"][expert][i].append(rho) # Add new rho to rho history
-            else:
-                for i in range(self.num_regions):
-                    alpha = self.beta_parameters[expert][i][0]
-                    beta = self.beta_parameters[expert][i][1]
-                    rho = alpha/(alpha+beta)
-                    rho = max(rho,0) # Just in case
-                    self.rho[expert][i] = rho
-                    self.history["rho"][expert][i].append(rho)
+            for i in range(self.num_regions):
+                self.history["rho"][expert][i].append(self.rho[expert][i]) # Add rho to rho history, kept up to date by learn
 
         base_action,exploit = self.agent.act(state,return_exploit=True)
 
@@ -144,7 +139,7 @@ class NonuniformClueAgent(Agent):
                     for expert in self.rho:
                         print("BEST:{}".format(expert))
                     best_expert = max(self.rho, key=self.rho.get)
-                    trust = np.random.choice([True,False],p=[self.rho[best_expert][region],1-self.rho[best_expert][region]])
+                    trust = np.random.random() < self.rho[best_expert][region]
                     if trust:
                         best_action = advice_dict[best_expert]
                 else:
@@ -180,7 +175,7 @@ class NonuniformClueAgent(Agent):
                         if probs[best_index]<self.threshold:
                             trust = False
                         else:
-                            trust = np.random.choice([True,False],p=[probs[best_index],1-probs[best_index]])
+                            trust = np.random.random() < probs[best_index]
                             if trust:
                                 best_action = {}
                                 for i in range(len(keys)):
@@ -193,18 +188,23 @@ class NonuniformClueAgent(Agent):
             else: # Don't follow advice
                 return base_action
 
-    def aggregate_advice(self,state):
+    def aggregate_advice(self,state,index=None):
         '''
         Retrieve all advice for a given state and put it in a dictionary
 
         Input:
             state - dict mapping state node name to value
+            index - index of the state given by state_indexer
+                computed from state if None
+                default: None
         Output:
             advice_dict - dict mapping expert name to advice
         '''
         advice_dict = {}
+        if index is None:
+            index = self.state_indexer.assignment_to_index(state)
         for expert in self.state_table_dict:
-            advice = self.state_table_dict[expert].get_value(state)
+            advice = self.state_table_dict[expert].values[index]
             if advice is not None:
                 advice_dict[expert] = advice
         return advice_dict
@@ -233,46 +233,44 @@ class NonuniformClueAgent(Agent):
         # Learn
         self.agent.learn(state,actions,reward)
 
-        region = self.regions.get_value(state)
         # Add advice to state table
+        index = self.state_indexer.assignment_to_index(state)
+        region = self.state_regions[index]
+        best_val = None # Best action value of the state, only needed if some advice is evaluated
         for expert in self.state_table_dict:
             # Add advice to table
             if advice[expert] is not None:
-                self.state_table_dict[expert].add_to_table(state,advice[expert])
+                self.state_table_dict[expert].values[index] = advice[expert]
 
             # Decide between regular update or update only on receiving new advice
             if self.regular_update:
                 # Fetch the latest advice (could be this trial or earlier)
-                latest_advice = self.state_table_dict[expert].get_value(state)
+                latest_advice = self.state_table_dict[expert].values[index]
             else:
                 # Only fetch advice from this trial (could be None)
                 latest_advice = advice[expert]
 
             if latest_advice is not None: # Can update this trial
-                # Evaluate advice
-                state_values,indices = self.agent.score_state(state)
-                best_val = max(state_values)
-                worst_val = min(state_values)
+                # Evaluate advice, scoring the state once for every expert
+                if best_val is None:
+                    state_values,indices = self.agent.score_state(state)
+                    best_val = max(state_values)
+                    worst_val = min(state_values)
                 advice_state = {}
                 for node in self.state_space:
                     advice_state[node] = state[node]
                 for node in actions:
                     advice_state[node] = latest_advice[node]
                 advice_val = self.agent.utility.get_value(advice_state)
+                advice_optimal = advice_val >= best_val # Whether the expert's advice is best
                 if self.sliding_window is not None: # Only count sliding_window number of evaluations
-                    if advice_val >= best_val:
-                        self.evals[expert][region].append(1) # Expert's advice is best
-                    else:
-                        self.evals[expert][region].append(0) # Expert's advice is not optimal
-
-                    if len(self.evals[expert][region])>self.sliding_window:
-                        self.evals[expert][region] = self.evals[expert][region][-self.sliding_window:]
+                    self.evals[expert][region].append(int(advice_optimal)) # Oldest evaluation drops out once the window is full
 
-                    self.optimal_dict[expert][region] = np.sum(self.evals[expert][region])
+                    self.optimal_dict[expert][region] = sum(self.evals[expert][region])
                     self.suboptimal_dict[expert][region] = len(self.evals[expert][region])-self.optimal_dict[expert][region]
 
                 else: # Count all evaluations
-                    if advice_val >= best_val:
+                    if advice_optimal:
                         self.optimal_dict[expert][region] += 1 # Expert's advice is best
                     else:
                         self.suboptimal_dict[expert][region] += 1 # Expert's advice is not optimal
@@ -280,12 +278,26 @@ class NonuniformClueAgent(Agent):
                 self.beta_parameters[expert][region] = (self.optimal_dict[expert][region],self.suboptimal_dict[expert][region])
                 if self.recency is not None:
                     # Recency weighted moving average
-                    if advice_val >= best_val:
-                        count_update = 1
-                    else:
-                        count_update = 0
+                    count_update = int(advice_optimal)
                     self.recent_rho[expert][region] = (1-self.recency) * self.recent_rho[expert][region] + count_update * self.recency
+                self.update_rho(expert,region)
 
+    def update_rho(self,expert,region):
+        '''
+        Recompute the estimated reliability of an expert in a region from its latest statistics
+        Only needed when those statistics change, rather than on every trial
+
+        Input:
+            expert - name of the expert
+            region - index of the region
+        '''
+        if self.recency is not None:
+            rho = self.recent_rho[expert][region]
+        else:
+            alpha = self.beta_parameters[expert][region][0]
+            beta = self.beta_parameters[expert][region][1]
+            rho = alpha/(alpha+beta)
+        self.rho[expert][region] = max(rho,0) # Just in case
 
     def num_models(self):
         '''
@@ -306,6 +318,7 @@ class NonuniformClueAgent(Agent):
         self.agent.reset() # Reset agent
         self.trial_count = 0 # Reset number of trials
         self.history = {"rho":{}} # Reset history
+        tables = self.state_table_dict # Tables of the last run, reused rather than rebuilt
         self.state_table_dict = {} # Reset advice table
         self.beta_parameters = {} # Reset reliability estimates
         self.optimal_dict = {}
@@ -314,7 +327,11 @@ class NonuniformClueAgent(Agent):
         self.recent_rho = {}
         self.evals = {}
         for expert in panel.experts:
-            self.state_table_dict[expert] = StateTable(self.state_space)
+            if expert in tables:
+                self.state_table_dict[expert] = tables.pop(expert)
+                self.state_table_dict[expert].values.fill(None)
+            else:
+                self.state_table_dict[expert] = StateTable(self.state_space)
             self.beta_parameters[expert] = []
             self.optimal_dict[expert] = []
             self.suboptimal_dict[expert] = []
@@ -324,14 +341,15 @@ class NonuniformClueAgent(Agent):
             if self.sliding_window is not None:
                 self.evals[expert] = []
             for i in range(self.num_regions):
-                self.rho[expert].append(self.initial_estimate[0]/(self.initial_estimate[0]+self.initial_estimate[1]))
                 self.recent_rho[expert].append(self.initial_estimate[0]/(self.initial_estimate[0]+self.initial_estimate[1]))
                 self.history["rho"][expert].append([])
                 self.beta_parameters[expert].append((self.initial_estimate[0],self.initial_estimate[1]))
+                self.rho[expert].append(None)
+                self.update_rho(expert,i)
                 self.optimal_dict[expert].append(self.initial_estimate[0])
                 self.suboptimal_dict[expert].append(self.initial_estimate[1])
                 if self.sliding_window is not None:
-                    self.evals[expert].append([])
+                    self.evals[expert].append(deque(maxlen=self.sliding_window))
             
 
     def takes_advice(self):
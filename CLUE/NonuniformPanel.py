@@ -29,10 +29,12 @@ class NonuniformPanel(Panel):
         self.name = name
 
         if experts is None:
+            self.oracle = oracle # Shared by every expert
             self.experts = {}
             expert_count = 0
             for rho_list in rhos:
                 self.experts[str(expert_count)] = NonuniformUnreliableExpert(env,oracle,rho_list,regions,mu=mu,gamma=gamma)
                 expert_count += 1
         else:
+            self.oracle = None
             self.experts = experts
\ No newline at end of file
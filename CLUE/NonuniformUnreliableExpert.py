@@ -51,6 +51,7 @@ class NonuniformUnreliableExpert(Expert):
 
         # Table for all possible actions
         self.action_table = StateTable(self.env.action_space)
+        self.action_assignments = [self.action_table.index_to_assignment(i) for i in range(self.action_table.size)]
 
     def advise(self,state,optimal_action=None):
         '''
@@ -70,16 +71,15 @@ class NonuniformUnreliableExpert(Expert):
             optimal_action = self.oracle.act(state) # Get best action to advise
         # Choose whether or not to give optimal advice this trial
         rho = self.rhos[self.regions.get_value(state)] # Get rho for this region in the state space
-        is_correct = np.random.choice([True,False],p=[rho,1-rho])
+        is_correct = np.random.random() < rho
         if is_correct: # Give correct advice
             return optimal_action
         else: # Give incorrect advice (any advice except optimal action)
             optimal_index = self.action_table.assignment_to_index(optimal_action) # Optimal index
-            indices = list(np.arange(self.action_table.size)) # Fetch all indices
-            indices.remove(optimal_index) # Remove optimal index
-            index = np.random.choice(indices) # Choose suboptimal index
-            suboptimal_action = self.action_table.index_to_assignment(index) # Get corresponding action
-            return suboptimal_action
+            index = np.random.randint(self.action_table.size-1) # Choose among all indices but one
+            if index >= optimal_index:
+                index += 1 # Skip over optimal index
+            return self.action_assignments[index] # Get corresponding action
 
     def deliberate(self,state,action,reward):
         '''
@@ -90,6 +90,50 @@ class NonuniformUnreliableExpert(Expert):
             action - dict mapping decision node names to domain value
             reward - the reward obtained this trial
 
+        Output:
+            advice_given - True if advice is given, false otherwise
+            advice - dict mapping decision node names to domain value if advice_given is True, None otherwise
+        '''
+        optimal_action = self.oracle.act(state) # Get optimal action
+        optimal_utility = self.oracle.expected_utility(state,optimal_action) # Get expected utility of optimal action
+        if action == optimal_action: # Agent acted optimally, no need to evaluate its action
+            agent_utility = optimal_utility
+        else:
+            agent_utility = self.oracle.expected_utility(state,action) # Get expected utility of the agent's action
+        return self.deliberate_precomputed(state,optimal_action,optimal_utility,agent_utility)
+
+    def deliberate_batch(self,trials):
+        '''
+        Decide whether or not to give advice for each trial in a buffer
+        Oracle queries for the whole buffer are evaluated together
+
+        Input:
+            trials - list of (state,action,reward) tuples, in the order they occurred
+                env.reset reuses its state dict, so buffer a copy of each state
+
+        Output:
+            results - list of (advice_given,advice) tuples, one per trial
+        '''
+        states = [trial[0] for trial in trials]
+        actions = [trial[1] for trial in trials]
+        optimal_actions = self.oracle.act_batch(states) # Get optimal actions
+        optimal_utilities = self.oracle.expected_utility_batch(states,optimal_actions) # Expected utilities of optimal actions
+        agent_utilities = self.oracle.expected_utility_batch(states,actions) # Expected utilities of the agent's actions
+        results = []
+        for i in range(len(trials)):
+            results.append(self.deliberate_precomputed(states[i],optimal_actions[i],optimal_utilities[i],agent_utilities[i]))
+        return results
+
+    def deliberate_precomputed(self,state,optimal_action,optimal_utility,agent_utility):
+        '''
+        Decide whether or not to give advice for this trial, given the oracle's evaluation of it
+
+        Input:
+            state - dict mapping node name to domain value of pre state chance nodes
+            optimal_action - dict mapping decision node names to domain value of the optimal action
+            optimal_utility - expected utility of the optimal action
+            agent_utility - expected utility of the agent's action
+
         Output:
             advice_given - True if advice is given, false otherwise
             advice - dict mapping decision node names to domain value if advice_given is True, None otherwise
@@ -98,9 +142,6 @@ class NonuniformUnreliableExpert(Expert):
         self.curr_trial += 1 # Increment trial counter
 
         # Update utility sums
-        optimal_action = self.oracle.act(state) # Get optimal action
-        optimal_utility = self.get_utility(state,optimal_action) # Get expected utility of optimal action
-        agent_utility = self.get_utility(state,action) # Get expected utility of the agent's action
         self.optimal_utility_sum += optimal_utility # Add expected utility to running sum
         self.agent_utility_sum += agent_utility # Add expected utility to running sum
 
@@ -121,20 +162,6 @@ class NonuniformUnreliableExpert(Expert):
         advised_action = self.advise(state,optimal_action=optimal_action) # Choose an action to advise
         return True,advised_action
 
-    def get_utility(self,state,action):
-        '''
-        Returns the expected utility of a given state, action pair
-
-        Input:
-            state - dict mapping state node name to domain value
-            action - dict mapping action node names to domain value
-
-        Output:
-            expected_utility - the expected utility of the state, action pair
-        '''
-        return self.oracle.expected_utility(state,action)
-
-
     def reset(self):
         '''
         Resets the expert for a fresh run
@@ -11,6 +11,9 @@ See their copyright below
 # See: http://creativecommons.org/licenses/by-nc-sa/4.0/deed.en
 '''
 
+import math
+import numpy as np
+
 class Graphical_model(object):
     """The class of graphical models.
     A graphical model consists of a set of variables and a set of factors.
@@ -85,17 +88,22 @@ class Factor(object):
             variables = self.variables
         else:
             variables = [v for v in variables if v in self.variables]
-        res = ""
+        # Domain value of each variable for every row, via the mixed radix offsets
+        indices = np.arange(self.size)
+        columns = []
         for v in variables:
-            res += str(v) + "\t"
-        res += self.name+"\n"
-        for i in range(self.size):
-            asst = self.index_to_assignment(i)
-            for v in variables:
-                res += str(asst[v])+"\t"
-            res += str(self.get_value(asst))
-            res += "\n"
-        return res
+            domain_strs = np.array([str(val) for val in v.domain])
+            columns.append(domain_strs[(indices // self.var_offsets[v]) % v.size])
+        # Read a fully computed table directly, otherwise evaluate each row
+        stored = getattr(self,"values",None)
+        if stored is not None and not (stored.dtype.kind == "f" and np.isnan(stored).any()):
+            values = [str(val) for val in stored.tolist()]
+        else:
+            values = [str(self.get_value(self.index_to_assignment(i))) for i in range(self.size)]
+        header = "".join(str(v)+"\t" for v in variables) + self.name
+        cells = zip(*columns) if columns else [()]*self.size
+        rows = ["".join(cell+"\t" for cell in row) + value for row,value in zip(cells,values)]
+        return "\n".join([header]+rows) + "\n"
 
     def brief(self):
         """returns a string representing a summary of the factor"""
@@ -127,12 +135,15 @@ class Factor(object):
         return asst
 
 class Factor_stored(Factor):
-    def __init__(self,variables,values):
+    def __init__(self,variables,values,dtype=np.float32):
+        """values is a table ordered according to variables, or None
+        dtype is the numpy type the table is stored as
+        """
         Factor.__init__(self, variables)
-        self.values = values
+        self.values = None if values is None else np.ascontiguousarray(values,dtype=dtype)
 
     def get_value(self,assignment):
-        return self.values[self.assignment_to_index(assignment)]
+        return self.values.item(self.assignment_to_index(assignment)) # item returns a Python scalar
 
 class Factor_observed(Factor):
     def __init__(self,factor,obs):
@@ -147,7 +158,7 @@ class Factor_observed(Factor):
         return self.orig_factor.get_value(ass)
 
 class Factor_sum(Factor_stored):
-    def __init__(self,var,factors):
+    def __init__(self,var,factors,dtype=np.float32):
         self.var_summed_out = var
         self.factors = factors
         vars = []
@@ -156,13 +167,14 @@ class Factor_sum(Factor_stored):
                 if v is not var and v not in vars:
                     vars.append(v)
         Factor_stored.__init__(self,vars,None)
-        self.values = [None]*self.size
+        self.values = np.full(self.size,np.nan,dtype=dtype) # nan marks values not yet computed
 
     def get_value(self,assignment):
         """lazy implementation: if not saved, compute it. Return saved value"""
         index = self.assignment_to_index(assignment)
-        if self.values[index]:
-            return self.values[index]
+        value = self.values.item(index)
+        if not math.isnan(value):
+            return value
         else:
             total = 0
             new_asst = assignment.copy()
@@ -189,11 +201,12 @@ def factor_times(variable,factors):
 
 class Prob(Factor_stored):
     """A factor defined by a conditional probability table"""
-    def __init__(self,var,pars,cpt):
+    def __init__(self,var,pars,cpt,dtype=np.float32):
         """Creates a factor from a conditional probability table, cptf.
         The cpt values are assumed to be for the ordering par+[var]
+        dtype is the numpy type the cpt is stored as
         """
-        Factor_stored.__init__(self,pars+[var],cpt)
+        Factor_stored.__init__(self,pars+[var],cpt,dtype=dtype)
         self.child = var
         self.parents = pars
         assert self.size==len(cpt),"Table size incorrect "+str(self)
@@ -227,7 +240,7 @@ class Factor_max(Factor_stored):
     Also builds a decision_function. This is based on Factor_sum.
     """
 
-    def __init__(self, dvar, factor):
+    def __init__(self, dvar, factor, dtype=np.float32):
         """dvar is a decision variable.
         factor is a factor that contains dvar and only parents of dvar
         """
@@ -235,14 +248,15 @@ class Factor_max(Factor_stored):
         self.factor = factor
         vars = [v for v in factor.variables if v is not dvar]
         Factor_stored.__init__(self,vars,None)
-        self.values = [None]*self.size
+        self.values = np.full(self.size,np.nan,dtype=dtype) # nan marks values not yet computed
         self.decision_fun = Factor_DF(dvar,vars,[None]*self.size)
 
     def get_value(self,assignment):
         """lazy implementation: if saved, return saved value, else compute it"""
         index = self.assignment_to_index(assignment)
-        if self.values[index]:
-            return self.values[index]
+        value = self.values.item(index)
+        if not math.isnan(value):
+            return value
         else:
             max_val = float("-inf")  # -infinity
             new_asst = assignment.copy()
@@ -259,17 +273,18 @@ class Factor_max(Factor_stored):
 class Factor_DF(Factor_stored):
     """A decision function"""
     def __init__(self,dvar, vars, values):
-        Factor_stored.__init__(self,vars,values)
+        Factor_stored.__init__(self,vars,values,dtype=object) # Stores domain values, not numbers
         self.dvar = dvar
         self.name = str(dvar)  # Used in printing
 
 class Utility(Factor_stored):
     """A factor defined by a utility"""
-    def __init__(self,vars,table):
+    def __init__(self,vars,table,dtype=np.float32):
         """Creates a factor on vars from the table.
         The table is ordered according to vars.
+        dtype is the numpy type the table is stored as
         """
-        Factor_stored.__init__(self,vars,table)
+        Factor_stored.__init__(self,vars,table,dtype=dtype)
         assert self.size==len(table),"Table size incorrect "+str(self)
 
 class Displayable(object):
@@ -402,9 +417,9 @@ class VE_DN(VE):
             new_proj_factors = []
             for fac in proj_factors:
                 if isinstance(fac,Factor_sum):
-                    if fac.values[0] is None:
+                    if np.isnan(fac.values[0]):
                         fac.get_value(fac.index_to_assignment(0))
-                    if fac.values[0]!=1:
+                    if not np.isclose(fac.values[0],1): # Tolerate rounding in low precision tables
                         new_proj_factors.append(fac)
                 else:
                     new_proj_factors.append(fac)
@@ -13,6 +13,10 @@ class PRQAgent(Agent):
         self.action_space = env.action_space
         self.initial_temp = temperature
         self.d_temp = temperature_change
+        # Index tables for states and actions, advice is stored as action indices
+        self.state_indexer = StateTable(self.state_space)
+        self.action_indexer = StateTable(self.action_space)
+        self.action_assignments = [self.action_indexer.index_to_assignment(i) for i in range(self.action_indexer.size)]
 
         if agent is None: # Default agent
             if isinstance(trials,int) and trials > 0: # Trials is valid
@@ -33,23 +37,32 @@ class PRQAgent(Agent):
         advice_given = bool(advice_dict)
 
         if advice_given:
-            # Calculate probability of using P
-            e_pows = [np.e**(self.temp**self.w_task)]
-            for expert in advice_dict:
-                e_pows.append(np.e**(self.temp**self.w_experts[expert]))
-            probs = e_pows/np.sum(e_pows)
-
-            policies = ["myself"]+list(advice_dict.keys())
-
-            self.chosen_policy = np.random.choice(policies,p=probs)
+            # Calculate probability of using P, softmax over temp**w
+            experts = list(advice_dict.keys())
+            expert_ids = [self.expert_index[expert] for expert in experts]
+            probs = self.logit_buffer[:len(experts)+1]
+            probs[0] = self.w[0]
+            np.take(self.w,expert_ids,out=probs[1:]) # Expert weights in one gather
+            np.power(self.temp,probs,out=probs) # temp**w for every policy at once
+            if probs.min() == probs.max():
+                # Every policy is equally likely (e.g. temp is 1 or no policy has been rewarded yet)
+                index = int(np.random.random()*len(probs))
+            else:
+                probs -= probs.max() # Shift by max so exp cannot overflow
+                np.exp(probs,out=probs)
+                # Sample by inverting the unnormalised CDF
+                np.cumsum(probs,out=probs)
+                index = int(np.searchsorted(probs,np.random.random()*probs[-1],side="right"))
 
-            if self.chosen_policy == "myself":
+            if index == 0:
                 # Agent's policy
+                self.chosen_policy_id = 0
                 return self.agent.act(state)
             else:
-                return advice_dict[self.chosen_policy]
+                self.chosen_policy_id = expert_ids[index-1]
+                return advice_dict[experts[index-1]]
         else:
-            self.chosen_policy = "myself"
+            self.chosen_policy_id = 0
             return self.agent.act(state)
 
     def aggregate_advice(self,state):
@@ -61,45 +74,42 @@ class PRQAgent(Agent):
         Output:
             advice_dict - dict mapping expert name to advice
         '''
+        state_index = self.state_indexer.assignment_to_index(state)
         advice_dict = {}
-        for expert in self.state_table_dict:
-            advice = self.state_table_dict[expert].get_value(state)
-            if advice is not None:
-                advice_dict[expert] = advice
+        for expert,action_index in zip(self.experts,self.advice_table[:,state_index].tolist()):
+            if action_index >= 0:
+                advice_dict[expert] = self.action_assignments[action_index]
         return advice_dict
 
     def learn(self,state,actions,reward,advice):
         # Learn
         self.agent.learn(state,actions,reward)
-        # Add advice to state table
-        for expert in self.state_table_dict:
-            # Add advice to table
-            if advice[expert] is not None:
-                self.state_table_dict[expert].add_to_table(state,advice[expert])
-        # PRQ Stuff
-        if self.chosen_policy == "myself":
-            self.w_task = (self.w_task*self.u_task+reward)/(self.u_task+1)
-            self.u_task += 1
-        else:
-            self.w_experts[self.chosen_policy] = (self.w_experts[self.chosen_policy]*self.u_experts[self.chosen_policy]+reward)/(self.u_experts[self.chosen_policy]+1)
-            self.u_experts[self.chosen_policy] += 1
+        # Add advice to advice table
+        state_index = self.state_indexer.assignment_to_index(state)
+        for i in range(len(self.experts)):
+            expert_advice = advice[self.experts[i]]
+            if expert_advice is not None:
+                self.advice_table[i,state_index] = self.action_indexer.assignment_to_index(expert_advice)
+        # PRQ Stuff, running mean of reward for the chosen policy
+        i = self.chosen_policy_id
+        self.w[i] = (self.w[i]*self.u[i]+reward)/(self.u[i]+1)
+        self.u[i] += 1
         self.temp += self.d_temp
 
 
     def reset(self,panel):
         self.agent.reset() # Reset agent
         # PRQ Stuff
-        self.state_table_dict = {} # Reset advice table
+        self.experts = list(panel.experts)
+        self.advice_table = np.full((len(self.experts),self.state_indexer.size),-1,dtype=int) # Advised action index per expert and state, -1 if none
         self.temp = self.initial_temp
-        self.w_task = 0
-        self.u_task = 0
-        self.w_experts = {}
-        self.u_experts = {}
-        #self.chosen_policy = None
-        for expert in panel.experts:
-            self.state_table_dict[expert] = StateTable(self.state_space)
-            self.w_experts[expert] = 0
-            self.u_experts[expert] = 0
+        # Weights and use counts of each policy, index 0 is the agent's own policy
+        self.w = np.zeros(len(panel.experts)+1)
+        self.u = np.zeros(len(panel.experts)+1,dtype=int)
+        self.expert_index = {} # Policy id of each expert, 0 is the agent's own policy
+        self.logit_buffer = np.empty(len(panel.experts)+1) # Reused by act for the policy softmax
+        for expert in self.experts:
+            self.expert_index[expert] = len(self.expert_index)+1
 
     def takes_advice(self):
         '''
@@ -27,10 +27,12 @@ class Panel:
         self.name = name
 
         if experts is None:
+            self.oracle = oracle # Shared by every expert
             self.experts = {}
             for rho in rhos:
                 self.experts[str(rho)] = UnreliableExpert(env,oracle,rho,mu=mu,gamma=gamma)
         else:
+            self.oracle = None
             self.experts = experts
 
     def advise(self,state,action,reward):
@@ -47,8 +49,27 @@ class Panel:
                     2. None
         '''
         advice = {}
-        for expert in self.experts:
-            _,advice[expert] = self.experts[expert].deliberate(state,action,reward)
+        if self.oracle is None:
+            for expert in self.experts:
+                _,advice[expert] = self.experts[expert].deliberate(state,action,reward)
+        else:
+            # Experts share an oracle, so evaluate the trial once for the whole panel
+            optimal_action = self.oracle.act(state)
+            optimal_utility = self.oracle.expected_utility(state,optimal_action)
+            if action == optimal_action: # Agent acted optimally, no need to evaluate its action
+                agent_utility = optimal_utility
+            else:
+                agent_utility = self.oracle.expected_utility(state,action)
+            # They were also built with the same mu and gamma, so they always decide together
+            # The first expert deliberates for the panel, the rest only choose their advice when it is given
+            advice_given = None
+            for expert in self.experts:
+                if advice_given is None:
+                    advice_given,advice[expert] = self.experts[expert].deliberate_precomputed(state,optimal_action,optimal_utility,agent_utility)
+                elif advice_given:
+                    advice[expert] = self.experts[expert].advise(state,optimal_action=optimal_action)
+                else:
+                    advice[expert] = None
         return advice
 
     def reset(self):
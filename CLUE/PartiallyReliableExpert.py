@@ -30,18 +30,44 @@ class PartiallyReliableExpert(Expert):
         # Fetch policy
         self.policy,self.utility = self.env.prune_state_nodes(hidden_nodes)
 
-    def advise(self,state):
+        # Memoised advice and utilities, keyed by tuples of node values
+        self.advice_cache = {}
+        self.utility_cache = {}
+
+    def advise(self,state,state_key=None):
         '''
         Advise on the best action to take given an assignment of state variables
 
         Input:
             state - dict mapping node name to domain value
+            state_key - key of the state's values given by env.state_key
+                computed from state if None
+                default: None
 
         Output:
             advice - dict mapping action node names to domain value
         '''
-        index = self.policy.assignment_to_index(state)
-        return self.policy.values[index]
+        if state_key is None:
+            state_key = self.env.state_key(state)
+        advice = self.advice_cache.get(state_key)
+        if advice is None:
+            index = self.policy.assignment_to_index(state)
+            advice = self.policy.values[index]
+            self.advice_cache[state_key] = advice
+        return advice
+
+    def advise_batch(self,states):
+        '''
+        Advise on the best action to take for each state in a batch
+        Can be compared directly with the oracle's act_batch over the same states
+
+        Input:
+            states - list of dicts mapping node name to domain value
+
+        Output:
+            advice - list of dicts mapping action node names to domain value
+        '''
+        return [self.advise(state,self.env.state_key(state)) for state in states]
 
     def deliberate(self,state,action,reward):
         '''
@@ -60,9 +86,13 @@ class PartiallyReliableExpert(Expert):
         self.curr_trial += 1 # Increment trial counter
 
         # Update utility sums
-        optimal_action = self.advise(state) # Get optimal action
-        optimal_utility = self.get_utility(state,optimal_action) # Get expected utility of optimal action
-        agent_utility = self.get_utility(state,action) # Get expected utility of the agent's action
+        state_key = self.env.state_key(state) # Shared by the cache lookups below
+        optimal_action = self.advise(state,state_key) # Get optimal action
+        optimal_utility = self.get_utility(state,optimal_action,state_key) # Get expected utility of optimal action
+        if action == optimal_action: # Agent acted optimally, no need to evaluate its action
+            agent_utility = optimal_utility
+        else:
+            agent_utility = self.get_utility(state,action,state_key) # Get expected utility of the agent's action
         self.optimal_utility_sum += optimal_utility # Add expected utility to running sum
         self.agent_utility_sum += agent_utility # Add expected utility to running sum
 
@@ -82,22 +112,32 @@ class PartiallyReliableExpert(Expert):
         self.agent_utility_sum = 0 # Reset sums
         return True,optimal_action
 
-    def get_utility(self,state,action):
+    def get_utility(self,state,action,state_key=None):
         '''
         Returns the expected utility of a given state, action pair
 
         Input:
             state - dict mapping state node name to domain value
             action - dict mapping action node names to domain value
+            state_key - key of the state's values given by env.state_key
+                computed from state if None
+                default: None
 
         Output:
             expected_utility - the expected utility of the state, action pair
         '''
-        assignment = state.copy()
-        for node in action:
-            assignment[node] = action[node]
-        index = self.utility.assignment_to_index(assignment)
-        return self.utility.values[index]
+        if state_key is None:
+            state_key = self.env.state_key(state)
+        key = (state_key,self.env.action_key(action))
+        expected_utility = self.utility_cache.get(key)
+        if expected_utility is None:
+            assignment = state.copy()
+            for node in action:
+                assignment[node] = action[node]
+            index = self.utility.assignment_to_index(assignment)
+            expected_utility = self.utility.values[index]
+            self.utility_cache[key] = expected_utility
+        return expected_utility
 
     def reset(self):
         '''
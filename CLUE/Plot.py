@@ -1,9 +1,16 @@
 import os
+import sys
 import csv
+import io
+import mmap
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+import matplotlib
+if "matplotlib.pyplot" not in sys.modules: # Leave the backend of a session that is already plotting
+    matplotlib.use("Agg") # Figures are only ever saved to file, so no GUI backend is needed
 import matplotlib.pyplot as plt
-import matplotlib.font_manager
-import statsmodels.api as sm # for smoothing
+from matplotlib.collections import PolyCollection
+from matplotlib.font_manager import FontProperties
 from mpl_toolkits.axes_grid1 import AxesGrid
 
 
@@ -24,12 +31,62 @@ my_colours = {
     "Nonuniform CLUE":"fuchsia"
 }
 
-# For Latex
-plt.rcParams.update({
-    "text.usetex": True
-    })
+# Trial numbers used as the x axis, by number of trials
+trial_axes = {}
 
-def smooth(y_mean,y_std,trials,reward_range=[None,None]):
+def trial_axis(trials):
+    '''
+    Array of trial numbers 0,...,trials-1, shared between plots of the same length
+
+    Input:
+        trials - number of trials
+    Output:
+        x - array of trial numbers, must not be modified
+    '''
+    x = trial_axes.get(trials)
+    if x is None:
+        x = np.arange(trials)
+        trial_axes[trials] = x
+    return x
+
+# Set CLUE_USETEX=0 or call set_latex(False) to draw text with matplotlib's mathtext instead of LaTeX, much faster for drafts
+use_tex = os.environ.get("CLUE_USETEX","1") == "1"
+
+def set_latex(flag):
+    '''
+    Choose whether plots drawn from now on render their text with LaTeX, overriding CLUE_USETEX
+
+    Input:
+        flag - True to render with LaTeX, False for mathtext
+    '''
+    global use_tex
+    use_tex = flag
+
+def use_latex():
+    '''
+    Render plot text with LaTeX unless disabled by CLUE_USETEX or set_latex, set when a figure is drawn rather than on import
+    '''
+    plt.rcParams.update({
+        "text.usetex": use_tex
+        })
+
+def column_mean_std(values):
+    '''
+    Mean and standard deviation of each column, reusing the mean for the deviation
+
+    Input:
+        values - 2D float array, one run per row. Overwritten with squared deviations
+    Output:
+        mean - array of column means
+        std - array of column standard deviations
+    '''
+    mean = values.mean(axis=0)
+    values -= mean
+    values *= values
+    std = np.sqrt(values.mean(axis=0))
+    return mean,std
+
+def smooth(y_mean,y_std,trials,reward_range=(None,None)):
     '''
     Smooth a mean curve and add boundaries for shading
 
@@ -40,33 +97,213 @@ def smooth(y_mean,y_std,trials,reward_range=[None,None]):
         reward_range - a list [min,max], where min is the minimum value and max the max value
             a value of None corresponds to no bound
             shaded areas will not go above and below these values
-            default - [None,None]
+            default - (None,None)
     Output:
         y - the smoothed curve, an array of numbers
         low - the lower bound of the shaded region
         high - the upper bound of the shaded region
     '''
-    x = np.arange(trials)
-    if reward_range[0] is None:
-        low = y_mean - y_std
-    else:
-        low = np.clip(y_mean-y_std,reward_range[0],None)
-    if reward_range[1] is None:
-        high = y_mean + y_std
-    else:
-        high = np.clip(y_mean+y_std,None,reward_range[1])
-    lowess = sm.nonparametric.lowess
-    y = lowess(y_mean, x, frac= 0.1, it=0, return_sorted=False)
-    low = lowess(low, x, frac= 0.1, it=0, return_sorted=False)
-    high = lowess(high, x, frac= 0.1, it=0, return_sorted=False)
+    # Mean, low and high curves are built in place as the columns of one array
+    curves = np.empty((len(y_mean),3))
+    curves[:,0] = y_mean
+    np.subtract(y_mean,y_std,out=curves[:,1])
+    np.add(y_mean,y_std,out=curves[:,2])
+    if reward_range[0] is not None:
+        np.maximum(curves[:,1],reward_range[0],out=curves[:,1])
+    if reward_range[1] is not None:
+        np.minimum(curves[:,2],reward_range[1],out=curves[:,2])
+    # Smoothed straight into contiguous float32 rows, plenty of precision for plotting
+    smoothed = np.empty((3,len(y_mean)),dtype=np.float32)
+    lowess(curves,frac=0.1,out=smoothed.T)
+    y,low,high = smoothed
     return y,low,high
 
-def read_rewards(reward_path,trials,accepted_panels=None,reward_range=[None,None],display=True):
+def lowess_projection(rows,left,k):
+    '''
+    Local linear regression weights for points of an evenly spaced curve
+
+    Input:
+        rows - array of indices of the points being fit
+        left - array of indices of the first point in each neighbourhood
+        k - number of points in each neighbourhood
+    Output:
+        projection - array of shape (len(rows),k), the fitted value of rows[i] is
+            the dot product of projection[i] with the curve from left[i] to left[i]+k
+        reg_ok - boolean array, False where too few points have weight to fit a line
+    '''
+    # Work in offsets from the point being fit, updating arrays in place to limit temporaries
+    offsets = (left-rows)[:,None] + np.arange(k,dtype=float)
+    radius = np.maximum(rows-left,left+k-1-rows)[:,None]
+    weights = np.abs(offsets)
+    weights /= radius
+    np.power(weights,3,out=weights)
+    np.subtract(1,weights,out=weights)
+    np.power(weights,3,out=weights) # Tricube
+    reg_ok = np.count_nonzero(weights > 1e-12,axis=1) >= 2
+    weights /= weights.sum(axis=1,keepdims=True)
+    mean_offset = np.einsum("ij,ij->i",weights,offsets)[:,None]
+    offsets -= mean_offset # Now x - weighted mean of x
+    var_x = np.maximum(np.einsum("ij,ij,ij->i",weights,offsets,offsets)[:,None],1e-12)
+    offsets *= -mean_offset/var_x
+    offsets += 1
+    offsets *= weights
+    return offsets,reg_ok
+
+def lowess(curves,frac=0.1,block=256,out=None):
+    '''
+    LOWESS smoothing of curves sampled at x = 0,1,...,n-1
+
+    Gives the same fit as statsmodels' lowess with it=0, but the local weights
+    only depend on x, so they are computed once and shared by every curve.
+    Away from the ends every neighbourhood has the same shape, so those points
+    are a single correlation with one kernel, done through the FFT for long ones.
+
+    Input:
+        curves - array of shape (n,c), one curve per column
+        frac - fraction of points used in each local regression
+            default - 0.1
+        block - number of points near each end fit at a time, bounds memory use
+            default - 256
+        out - array of shape (n,c) to write the fit into, may be another dtype
+            if None, a new array is allocated
+            default - None
+    Output:
+        fit - array of shape (n,c), the smoothed curves
     '''
-    Read reward csvs into arrays
+    curves = np.asarray(curves,dtype=float)
+    n = curves.shape[0]
+    k = min(max(int(frac*n+1e-10),2),n)
+    half = k//2
+    rows = np.arange(n)
+    left = np.clip(rows-half,0,n-k)
+    fit = np.empty_like(curves) if out is None else out
+
+    # Interior points share one kernel
+    kernel,reg_ok = lowess_projection(rows[half:half+1],left[half:half+1],k)
+    if not reg_ok[0]:
+        fit[half:n-k+half+1] = curves[half:n-k+half+1]
+    elif k <= 64: # Short kernels are cheapest to correlate directly
+        for c in range(curves.shape[1]):
+            fit[half:n-k+half+1,c] = np.correlate(curves[:,c],kernel[0],"valid")
+    else: # Long kernels are correlated with every curve at once through the FFT
+        size = n+k-1
+        kernel_fft = np.fft.rfft(kernel[0][::-1],size)
+        curves_fft = np.fft.rfft(curves,size,axis=0)
+        fit[half:n-k+half+1] = np.fft.irfft(curves_fft*kernel_fft[:,None],size,axis=0)[k-1:n]
+
+    # Points near the ends fit the first or last k points, and the right end mirrors
+    # the left, so each block of weights serves both ends
+    for start in range(0,half,block):
+        end_rows = rows[start:min(start+block,half)]
+        projection,reg_ok = lowess_projection(end_rows,left[end_rows],k)
+        fit[end_rows] = projection @ curves[:k]
+        fit[end_rows[~reg_ok]] = curves[end_rows[~reg_ok]]
+        mirror_rows = n-1-end_rows
+        mirrored = mirror_rows > n-k+half # Mirrored rows that are past the interior
+        right_rows = mirror_rows[mirrored]
+        fit[right_rows] = projection[mirrored,::-1] @ curves[n-k:]
+        right_rows = right_rows[~reg_ok[mirrored]]
+        fit[right_rows] = curves[right_rows]
+    return fit
+
+def map_result_csv(path):
+    '''
+    Memory map a results csv and read its header, leaving the rows to be parsed if needed
 
     Input:
-        reward_path - path to directory with reward csvs
+        path - path to the csv file
+    Output:
+        header - list of header fields
+        mm - read only memory map of the whole file, to be closed by the caller
+        rows_start - offset of the first row after the header
+    '''
+    with open(path,"rb") as f:
+        if hasattr(os,"posix_fadvise"): # Read ahead, the rows are parsed front to back
+            os.posix_fadvise(f.fileno(),0,0,os.POSIX_FADV_SEQUENTIAL)
+        mm = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+    rows_start = mm.find(b"\n")+1
+    if rows_start == 0: # Header only
+        rows_start = len(mm)
+    header = next(csv.reader([mm[:rows_start].decode()]))
+    return header,mm,rows_start
+
+def list_result_files(path):
+    '''
+    List the results files in a directory, saved as csv or npz
+    Smoothing caches are skipped, as is a csv whose results were also saved as npz
+
+    Input:
+        path - path to directory with results files
+    Output:
+        files - list of file names
+    '''
+    filenames = os.listdir(path)
+    npz_names = {filename[:-len(".npz")] for filename in filenames if filename.endswith(".npz") and ".smooth_" not in filename}
+    files = []
+    for filename in filenames:
+        name,extension = os.path.splitext(filename)
+        if (extension == ".npz" and name in npz_names) or (extension == ".csv" and name not in npz_names):
+            files.append(filename)
+    return files
+
+def read_result_header(path):
+    '''
+    Read the header of a results file, saved as csv or npz
+
+    Input:
+        path - path to the results file
+    Output:
+        header - list of header fields
+    '''
+    if path.endswith(".npz"):
+        with np.load(path) as results:
+            return results["header"].tolist()
+    with open(path,newline="") as f:
+        return next(csv.reader([f.readline()]))
+
+def read_result_runs(path):
+    '''
+    Read the runs of a results file, saved as csv or npz
+
+    Input:
+        path - path to the results file
+    Output:
+        values - 2D float array, one row per run
+    '''
+    if path.endswith(".npz"):
+        with np.load(path) as results:
+            return np.asarray(results["runs"],dtype=float)
+    header,mm,rows_start = map_result_csv(path)
+    values = parse_runs(mm[rows_start:])
+    mm.close()
+    return values
+
+def parse_runs(data):
+    '''
+    Parse the rows of a results csv after its header
+
+    Input:
+        data - bytes of the csv rows, one run per row
+    Output:
+        values - 2D float array, one row per run
+    '''
+    first_row_end = data.find(b"\n")
+    if first_row_end < 0:
+        first_row_end = len(data)
+    columns = data.count(b",",0,first_row_end)+1
+    # Parse every number in one call, then split into rows
+    values = np.fromstring(data.replace(b"\n",b","),sep=",")
+    if values.size % columns != 0: # Ragged rows, fall back to the line by line parser
+        return np.loadtxt(io.StringIO(data.decode()),delimiter=",",ndmin=2)
+    return values.reshape(-1,columns)
+
+def read_reward_file(reward_path,filename,trials,accepted_panels=None,reward_range=(None,None),display=True):
+    '''
+    Read and smooth a single reward file, saved as csv or npz
+
+    Input:
+        reward_path - path to directory with reward files
+        filename - name of the file in reward_path
         trials - number of trials
         accepted_panels - list of panels to be read
             None if all panels are to be accepted
@@ -74,7 +311,63 @@ def read_rewards(reward_path,trials,accepted_panels=None,reward_range=[None,None
         reward_range - a list [min,max], where min is the minimum value and max the max value
             a value of None corresponds to no bound
             shaded areas will not go above and below these values
-            default - [None,None]
+            default - (None,None)
+        display - a boolean, if True will print when the file is processed
+            default - True
+    Advice-taking agents' files are named agent__panel.csv (or .npz), so files of panels that
+    are not accepted are skipped without being opened. Files not following this
+    convention are filtered on their header instead.
+
+    Output:
+        None if the file's panel is not accepted, otherwise a tuple of
+        agent - agent name
+        panel - panel name, "" if the agent does not take advice
+        y - the smoothed reward curve
+        low - the lower bound of the shaded region
+        high - the upper bound of the shaded region
+        final_std - standard deviation of the reward on the final trial
+    '''
+    if accepted_panels is not None:
+        _,separator,panel_hint = os.path.splitext(filename)[0].partition("__")
+        if separator and panel_hint not in accepted_panels:
+            return None
+    header = read_result_header(reward_path+filename)
+    agent = header[0]
+    panel = header[1]
+    if not (accepted_panels is None or panel in accepted_panels or panel == ""):
+        return None
+    if display:
+        print("Processing "+filename)
+    # Smoothed curves are cached next to the results file, per trials and reward range
+    cache_path = "{}{}.smooth_{}_{}_{}.npz".format(reward_path,filename,trials,reward_range[0],reward_range[1])
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(reward_path+filename):
+        cache = np.load(cache_path)
+        y,low,high,final_std = cache["y"],cache["low"],cache["high"],cache["final_std"]
+    else:
+        rewards = read_result_runs(reward_path+filename)
+        y_mean,y_std = column_mean_std(rewards)
+        final_std = y_std[-1]
+        y,low,high = smooth(y_mean,y_std,trials,reward_range=reward_range)
+        np.savez(cache_path,y=y,low=low,high=high,final_std=final_std)
+    return agent,panel,y,low,high,final_std
+
+# Results of read_rewards, by directory, arguments and results file modification times
+reward_cache = {}
+
+def read_rewards(reward_path,trials,accepted_panels=None,reward_range=(None,None),display=True):
+    '''
+    Read reward files into arrays
+
+    Input:
+        reward_path - path to directory with reward files, saved as csv or npz
+        trials - number of trials
+        accepted_panels - list of panels to be read
+            None if all panels are to be accepted
+            default - None
+        reward_range - a list [min,max], where min is the minimum value and max the max value
+            a value of None corresponds to no bound
+            shaded areas will not go above and below these values
+            default - (None,None)
         display - a boolean, if True will print regular updates on plotting progress
             default - True
     Output:
@@ -92,55 +385,88 @@ def read_rewards(reward_path,trials,accepted_panels=None,reward_range=[None,None
         agents - list of agent names
         panels - list of panel names
     '''
+    files = list_result_files(reward_path) # Skip smoothing caches and other files
+
+    # Reuse results from earlier calls in this process if no results file has changed since
+    panel_key = None if accepted_panels is None else tuple(accepted_panels)
+    modified = tuple((filename,os.path.getmtime(reward_path+filename)) for filename in files)
+    key = (reward_path,trials,panel_key,tuple(reward_range),modified)
+    if key in reward_cache:
+        reward_means,reward_low,reward_high,takes_advice,agents,panels = reward_cache[key]
+        return reward_means,reward_low,reward_high,takes_advice,list(agents),list(panels) # Callers may extend the lists
+
     reward_means = {}
     reward_low = {}
     reward_high = {}
     takes_advice = {}
     agents = []
     panels = []
-
-    files = os.listdir(reward_path)
-    # Read and smooth
-    for filename in files:
-        f = open(reward_path+filename,"r",newline="")
-        reader = csv.reader(f, delimiter=',')
-        header = next(reader)
-        agent = header[0]
-        panel = header[1]
-        if accepted_panels is None or panel in accepted_panels or panel == "":
-            if display:
-                print("Processing "+filename)
-            reward_list = []
-            for row in reader:
-                reward_list.append(row)
-            f.close()
-            rewards = np.array(reward_list).astype(float)
-            y_mean = np.mean(rewards,axis=0)
-            y_std = np.std(rewards,axis=0)
-            print(filename+" std:"+str(y_std[-1]))
-            y,low,high = smooth(y_mean,y_std,trials,reward_range=reward_range)
+    panel_set = set() # Membership checks, panels keeps the order
+
+    # Read and smooth each file in parallel, then collect results in file order
+    # Largest files are started first so one big file does not finish last on its own
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = {}
+        for filename in sorted(files,key=lambda filename: -os.path.getsize(reward_path+filename)):
+            futures[filename] = executor.submit(read_reward_file,reward_path,filename,trials,accepted_panels,reward_range,display)
+        results = [futures[filename].result() for filename in files]
+    for filename,result in zip(files,results):
+        if result is not None:
+            agent,panel,y,low,high,final_std = result
+            print(filename+" std:"+str(final_std))
             if panel=="": # doesn't take advice
-                reward_means[agent] = np.array(y,dtype=float)
-                reward_low[agent] = np.array(low,dtype=float)
-                reward_high[agent] = np.array(high,dtype=float)
+                reward_means[agent] = y
+                reward_low[agent] = low
+                reward_high[agent] = high
                 takes_advice[agent] = False
                 agents.append(agent)
             else:
-                if panel not in panels:
+                if panel not in panel_set:
+                    panel_set.add(panel)
                     panels.append(panel)
-                if agent not in agents:
+                if agent not in takes_advice:
                     reward_means[agent] = {}
                     reward_low[agent] = {}
                     reward_high[agent] = {}
                     takes_advice[agent] = True
                     agents.append(agent)
-                reward_means[agent][panel] = np.array(y,dtype=float)
-                reward_low[agent][panel] = np.array(low,dtype=float)
-                reward_high[agent][panel] = np.array(high,dtype=float)
-        else:
-            f.close()
+                reward_means[agent][panel] = y
+                reward_low[agent][panel] = low
+                reward_high[agent][panel] = high
 
-    return reward_means,reward_low,reward_high,takes_advice,agents,panels
+    reward_cache[key] = (reward_means,reward_low,reward_high,takes_advice,agents,panels)
+    return reward_means,reward_low,reward_high,takes_advice,list(agents),list(panels)
+
+def read_rho_file(rho_path,filename,trials,accepted_panels=None):
+    '''
+    Read and smooth a single rho file, saved as csv or npz
+
+    Input:
+        rho_path - path to directory with rho files
+        filename - name of the file in rho_path
+        trials - number of trials
+        accepted_panels - list of panels to be read
+            None if all panels are to be accepted
+            default - None
+    Output:
+        None if the file's panel is not accepted, otherwise a tuple of
+        agent - agent name
+        panel - panel name
+        rel - the expert's reliability, as written in the header
+        y - the smoothed rho curve
+        low - the lower bound of the shaded region
+        high - the upper bound of the shaded region
+    '''
+    header = read_result_header(rho_path+filename)
+    agent = header[0]
+    panel = header[1]
+    rel = header[2]
+    if not (accepted_panels is None or panel in accepted_panels or panel == ""):
+        return None
+    rho = read_result_runs(rho_path+filename)
+    y_mean,y_std = column_mean_std(rho)
+    y,low,high = smooth(y_mean,y_std,trials)
+    return agent,panel,rel,y,low,high
 
 def read_rhos(rho_path,trials,accepted_panels=None):
 
@@ -150,52 +476,76 @@ def read_rhos(rho_path,trials,accepted_panels=None):
     agents = []
     panels = []
     rels = {}
-
-    files = os.listdir(rho_path)
-    # Read and smooth
-    for filename in files:
-        f = open(rho_path+filename,"r",newline="")
-        reader = csv.reader(f, delimiter=',')
-        header = next(reader)
-        agent = header[0]
-        panel = header[1]
-        rel = header[2]
-        if accepted_panels is None or panel in accepted_panels or panel == "":
-            rho_list = []
-            for row in reader:
-                rho_list.append(row)
-            f.close()
-            rho = np.array(rho_list).astype(float)
-            y_mean = np.mean(rho,axis=0)
-            y_std = np.std(rho,axis=0)
-            y,low,high = smooth(y_mean,y_std,trials)
-            if panel not in panels:
+    rel_sets = {} # Membership checks, rels keeps the order
+
+    files = list_result_files(rho_path)
+    # Read and smooth each file in parallel, then collect results in file order
+    # Largest files are started first so one big file does not finish last on its own
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = {}
+        for filename in sorted(files,key=lambda filename: -os.path.getsize(rho_path+filename)):
+            futures[filename] = executor.submit(read_rho_file,rho_path,filename,trials,accepted_panels)
+        results = [futures[filename].result() for filename in files]
+    for result in results:
+        if result is not None:
+            agent,panel,rel,y,low,high = result
+            if panel not in rels:
                 panels.append(panel)
                 rels[panel] = []
-            if agent not in agents:
+                rel_sets[panel] = set()
+            if agent not in rhos:
                 rhos[agent] = {}
                 rho_low[agent] = {}
                 rho_high[agent] = {}
                 agents.append(agent)
-            if rel not in rels[panel]:
+            if rel not in rel_sets[panel]:
+                rel_sets[panel].add(rel)
                 rels[panel].append(rel)
             if panel not in rhos[agent]:
                 rhos[agent][panel] = {}
                 rho_low[agent][panel] = {}
                 rho_high[agent][panel] = {}
-            rhos[agent][panel][str(rel)] = np.array(y,dtype=float)
-            rho_low[agent][panel][str(rel)] = np.array(low,dtype=float)
-            rho_high[agent][panel][str(rel)] = np.array(high,dtype=float)
-        else:
-            f.close()
+            rhos[agent][panel][str(rel)] = y
+            rho_low[agent][panel][str(rel)] = low
+            rho_high[agent][panel][str(rel)] = high
 
     return rhos,rho_low,rho_high,agents,panels,rels
 
+def stack_rewards(values,takes_advice,agents,panels,trials):
+    '''
+    Arrange curves returned by read_rewards into a single array
+
+    Input:
+        values - dict of curves from read_rewards, e.g. reward_means
+        takes_advice - dict mapping agent to True if it takes advice, False otherwise
+        agents - list of agent names, in the order of the first axis
+        panels - list of panel names, in the order of the second axis
+        trials - number of trials
+    Output:
+        stacked - float32 array of shape (len(agents),len(panels),trials)
+            agents that do not take advice have the same curve for every panel
+            nan where an agent has no curve for a panel
+    '''
+    stacked = np.full((len(agents),len(panels),trials),np.nan,dtype=np.float32)
+    for a in range(len(agents)):
+        agent = agents[a]
+        if takes_advice[agent]:
+            for p in range(len(panels)):
+                if panels[p] in values[agent]:
+                    stacked[a,p] = values[agent][panels[p]]
+        else:
+            stacked[a,:] = values[agent]
+    return stacked
+
 def plot_beta_heatmap(base_path,alphas,betas,panel_titles,baseline="Baseline Agent",rounding=1,vrange=None):
     # Read in regrets
     f = open("results/"+base_path+"regrets.csv","r",newline="")
     reader = csv.reader(f, delimiter=',')
 
+    # Positions of each parameter value in the heatmap axes
+    alpha_index = {float(alpha):i for i,alpha in enumerate(alphas)}
+    beta_index = {float(beta):i for i,beta in enumerate(betas)}
+
     regrets = {}
     takes_advice = {}
     has_beta = {}
@@ -224,16 +574,16 @@ def plot_beta_heatmap(base_path,alphas,betas,panel_titles,baseline="Baseline Age
                 else: # Uses beta distribution
                     has_beta[agent] = True
                     regrets[agent][panel] = np.zeros((len(alphas),len(betas)))
-                    regrets[agent][panel][alphas.index(float(a))][betas.index(float(b))] = mean_regret
+                    regrets[agent][panel][alpha_index[float(a)],beta_index[float(b)]] = mean_regret
         else: # Agent already in dict
             if a == "": # Doesn't have beta distribution
                 regrets[agent][panel] = mean_regret
             else: # Uses beta distribution
                 if panel in regrets[agent]: # Panel already seen before
-                    regrets[agent][panel][alphas.index(float(a))][betas.index(float(b))] = mean_regret
+                    regrets[agent][panel][alpha_index[float(a)],beta_index[float(b)]] = mean_regret
                 else: # Never encountered agent-panel pair
                     regrets[agent][panel] = np.zeros((len(alphas),len(betas)))
-                    regrets[agent][panel][alphas.index(float(a))][betas.index(float(b))] = mean_regret
+                    regrets[agent][panel][alpha_index[float(a)],beta_index[float(b)]] = mean_regret
     f.close()
 
     # Calculate differences
@@ -268,6 +618,9 @@ def plot_expert_heatmap(base_path,mus,gammas,panel_titles,baseline="Baseline Age
     # Make sure mus and gammas are floats
     mus = list(np.array(mus,dtype=float))
     gammas = list(np.array(gammas,dtype=float))
+    # Positions of each parameter value in the heatmap axes
+    mu_index = {mu:i for i,mu in enumerate(mus)}
+    gamma_index = {gamma:i for i,gamma in enumerate(gammas)}
 
     regrets = {}
     takes_advice = {}
@@ -290,13 +643,13 @@ def plot_expert_heatmap(base_path,mus,gammas,panel_titles,baseline="Baseline Age
                 takes_advice[agent] = True
                 regrets[agent] = {}
                 regrets[agent][panel] = np.zeros((len(mus),len(gammas)))
-                regrets[agent][panel][mus.index(float(mu))][gammas.index(float(gamma))] = mean_regret
+                regrets[agent][panel][mu_index[float(mu)],gamma_index[float(gamma)]] = mean_regret
         else: # Agent already in dict
             if panel in regrets[agent]: # Panel already seen before
-                regrets[agent][panel][mus.index(float(mu))][gammas.index(float(gamma))] = mean_regret
+                regrets[agent][panel][mu_index[float(mu)],gamma_index[float(gamma)]] = mean_regret
             else: # Never encountered agent-panel pair
                 regrets[agent][panel] = np.zeros((len(mus),len(gammas)))
-                regrets[agent][panel][mus.index(float(mu))][gammas.index(float(gamma))] = mean_regret
+                regrets[agent][panel][mu_index[float(mu)],gamma_index[float(gamma)]] = mean_regret
     f.close()
 
     # Calculate differences
@@ -318,6 +671,38 @@ def plot_expert_heatmap(base_path,mus,gammas,panel_titles,baseline="Baseline Age
         plot_heatmap(fig_path,agent+"_regrets",panel_titles,regret_vals[agent],"$\\mu$",mus,"$\\gamma$",gammas,rounding=rounding,vrange=vrange)
         plot_heatmap(fig_path,agent+"_regret_diffs",panel_titles,regret_diffs[agent],"$\\mu$",mus,"$\\gamma$",gammas,rounding=rounding,vrange=vrange)
 
+# Heatmap figures and their axes grids, by number of panels, reused between heatmaps
+heatmap_grids = {}
+
+def heatmap_grid(n_panels):
+    '''
+    Empty figure with a row of heatmap axes and a shared colour bar, reused between calls
+
+    Input:
+        n_panels - number of heatmaps in the row
+    Output:
+        fig - the figure
+        grid - the AxesGrid, with one axis per panel
+    '''
+    if n_panels in heatmap_grids:
+        fig,grid = heatmap_grids[n_panels]
+        for ax in grid:
+            ax.clear()
+        grid.cbar_axes[0].clear()
+        grid.set_label_mode("L") # Clearing shows the inner tick labels again
+        return fig,grid
+    fig = plt.figure(figsize=(4*n_panels, 4))
+    grid = AxesGrid(fig, 111,
+                nrows_ncols=(1, n_panels),
+                axes_pad=0.05,
+                share_all=True,
+                label_mode="L",
+                cbar_location="right",
+                cbar_mode="single",
+                )
+    heatmap_grids[n_panels] = (fig,grid)
+    return fig,grid
+
 def plot_heatmap(fig_path,filename,panel_titles,vals,x_label,x_vals,y_label,y_vals,rounding=1,rev=True,vrange=None):
     os.makedirs(os.path.dirname(fig_path), exist_ok=True)
     panels = list(panel_titles.keys())
@@ -333,15 +718,9 @@ def plot_heatmap(fig_path,filename,panel_titles,vals,x_label,x_vals,y_label,y_va
     else:
         vmin = vrange[0]
         vmax = vrange[1]
-    fig = plt.figure(figsize=(4*len(panels), 4))
-    grid = AxesGrid(fig, 111,
-                nrows_ncols=(1, len(panels)),
-                axes_pad=0.05,
-                share_all=True,
-                label_mode="L",
-                cbar_location="right",
-                cbar_mode="single",
-                )
+    use_latex()
+    fig,grid = heatmap_grid(len(panels))
+    cell_font = FontProperties(weight="bold") # Shared by every cell label
     if rev:
         cmap = "RdYlGn_r"
     else:
@@ -358,13 +737,15 @@ def plot_heatmap(fig_path,filename,panel_titles,vals,x_label,x_vals,y_label,y_va
         ax.set_ylabel(y_label)
         ax.set_yticks(range(len(y_vals)))
         ax.set_yticklabels(y_vals)
-        for (j,k),label in np.ndenumerate(np.round(val,rounding)):
-            ax.text(k,j,label,ha='center',va='center',fontweight="bold")
+        labels = np.char.mod("%s",np.round(val,rounding)) # Formatted once, as matplotlib would
+        for (j,k),label in np.ndenumerate(labels):
+            # Plain numbers, so skip the LaTeX round trip for every cell
+            ax.text(k,j,label,ha='center',va='center',fontproperties=cell_font,usetex=False)
     grid.cbar_axes[0].colorbar(im)
-    plt.savefig(fig_path+filename)
-    plt.close()
+    fig.savefig(fig_path+filename)
+    plt.close(fig)
 
-def plot_reward_comparison_individual(base_path,trials,accepted_panels=None,panel_titles=None,reward_range=[None,None]):
+def plot_reward_comparison_individual(base_path,trials,accepted_panels=None,panel_titles=None,reward_range=(None,None),dpi=256):
     path = "results/"+base_path
     fig_path = "figures/"+base_path
     reward_path = path+"rewards/"
@@ -382,10 +763,11 @@ def plot_reward_comparison_individual(base_path,trials,accepted_panels=None,pane
         agent_labels.append(agent_names[agent])
 
     # Plot
-    x = np.arange(trials)
+    x = trial_axis(trials)
     file_dir = fig_path+"agent_comparison/"
 
     os.makedirs(os.path.dirname(file_dir), exist_ok=True)
+    use_latex()
     for i in range(len(panels)):
         panel = accepted_panels[i]
         fig, ax = plt.subplots(ncols=1,figsize=(5,4))
@@ -408,10 +790,29 @@ def plot_reward_comparison_individual(base_path,trials,accepted_panels=None,pane
         fig.subplots_adjust(bottom=bottom, wspace=wspace)
         plt.legend(labels=agent_labels,loc='upper left',
                  bbox_to_anchor=(0, -bottom/2),fancybox=False, shadow=False, ncol=len(agents))
-        plt.savefig(file_dir+panel+"_reward_comparison.png",dpi=256)
+        plt.savefig(file_dir+panel+"_reward_comparison.png",dpi=dpi)
         plt.close()
 
-def plot_reward_comparison(base_path,trials,accepted_panels=None,panel_titles=None,reward_range=[None,None],fill=True):
+def band_vertices(x, low, high):
+    '''
+    Outline of the shaded band between two curves, as drawn by fill_between
+
+    Input:
+        x - x values of both curves
+        low - lower curve
+        high - upper curve
+    Output:
+        vertices - (2*len(x),2) array, along the lower curve and back along the upper curve
+    '''
+    n = len(x)
+    vertices = np.empty((2*n,2))
+    vertices[:n,0] = x
+    vertices[:n,1] = low
+    vertices[n:,0] = x[::-1]
+    vertices[n:,1] = high[::-1]
+    return vertices
+
+def plot_reward_comparison(base_path,trials,accepted_panels=None,panel_titles=None,reward_range=(None,None),fill=True,dpi=256):
     '''
     Plot a comparison of rewards
 
@@ -427,7 +828,9 @@ def plot_reward_comparison(base_path,trials,accepted_panels=None,panel_titles=No
         reward_range - a list [min,max], where min is the minimum value and max the max value
             a value of None corresponds to no bound
             shaded areas will not go above and below these values
-            default - [None,None]
+            default - (None,None)
+        dpi - resolution of the saved figure, lower is faster for drafts
+            default - 256
     '''
     path = "results/"+base_path
     fig_path = "figures/"+base_path
@@ -455,32 +858,40 @@ def plot_reward_comparison(base_path,trials,accepted_panels=None,panel_titles=No
         accepted_panels.append("No Expert")
 
     # Plot
-    x = np.arange(trials)
+    x = trial_axis(trials)
     file_dir = fig_path+"agent_comparison/"
     os.makedirs(os.path.dirname(file_dir), exist_ok=True)
+    use_latex()
     fig, ax = plt.subplots(ncols=len(panels),figsize=(4*len(panels),4.8))
     if len(panels)==1:
         ax = [ax]
     plot_list = []
+    # Curves as (agent, panel, trial) arrays, so each panel is a slice
+    plot_panels = accepted_panels[:len(panels)]
+    means = stack_rewards(reward_means,takes_advice,agents,plot_panels,trials)
+    if fill:
+        lows = stack_rewards(reward_low,takes_advice,agents,plot_panels,trials)
+        highs = stack_rewards(reward_high,takes_advice,agents,plot_panels,trials)
     for i in range(len(panels)):
         panel = accepted_panels[i]
-        for agent in agents:
-            agent_name = agent_names[agent]
-            if takes_advice[agent]:
-                if fill:
-                    ax[i].fill_between(x, reward_low[agent][panel], reward_high[agent][panel], alpha=0.2, color=my_colours[agent])
-                l, = ax[i].plot(x,reward_means[agent][panel],label=agent_name, color=my_colours[agent])
-            else:
-                if fill:
-                    ax[i].fill_between(x, reward_low[agent], reward_high[agent], alpha=0.2, color=my_colours[agent])
-                l, = ax[i].plot(x,reward_means[agent],label=agent_name, color=my_colours[agent])
-            plot_list.append(l)
-            ax[i].set_xlabel("Trials")
-            ax[i].set_ylabel("Average Reward")
-            if panel_titles is not None:
-                ax[i].set_title(panel_titles[panel])
-            else:
-                ax[i].set_title(panel)
+        if fill:
+            # All bands of this panel in one collection, one polygon per agent
+            shown = [a for a in range(len(agents)) if not np.isnan(means[a,i,0])]
+            bands = PolyCollection([band_vertices(x,lows[a,i],highs[a,i]) for a in shown],
+                                   facecolors=[my_colours[agents[a]] for a in shown],alpha=0.2,linewidths=0)
+            ax[i].add_collection(bands)
+        # All mean curves of this panel in one plot call, one column per agent
+        lines = ax[i].plot(x,means[:,i].T)
+        for agent,l in zip(agents,lines):
+            l.set_label(agent_names[agent])
+            l.set_color(my_colours[agent])
+        plot_list.extend(lines)
+        ax[i].set_xlabel("Trials")
+        ax[i].set_ylabel("Average Reward")
+        if panel_titles is not None:
+            ax[i].set_title(panel_titles[panel])
+        else:
+            ax[i].set_title(panel)
     if len(panels) == 1:
         wspace = -0.5
     else:
@@ -494,10 +905,10 @@ def plot_reward_comparison(base_path,trials,accepted_panels=None,panel_titles=No
     if not fill:
         fname += "_nofill"
     fname += ".png"
-    plt.savefig(fname,dpi=256)
+    plt.savefig(fname,dpi=dpi)
     plt.close()
 
-def plot_rhos(base_path,trials,accepted_panels=None,panel_titles=None):
+def plot_rhos(base_path,trials,accepted_panels=None,panel_titles=None,dpi=256):
     path = "results/"+base_path
     fig_path = "figures/"+base_path
     rho_path = path+"rhos/"
@@ -526,22 +937,22 @@ def plot_rhos(base_path,trials,accepted_panels=None,panel_titles=None):
         agent_labels.append(agent_names[agent])
 
     # Plot
-    x = np.arange(trials)
+    x = trial_axis(trials)
     file_dir = fig_path+"rho_comparison/"
     os.makedirs(os.path.dirname(file_dir), exist_ok=True)
 
-    c_map = plt.cm.get_cmap("tab20", len(all_rels))
-    colours = {}
-    for rel in all_rels_str:
-        colours[rel] = c_map(all_rels_str.index(rel))
+    c_map = plt.get_cmap("tab20", len(all_rels))
+    colours = {rel:c_map(i) for i,rel in enumerate(all_rels_str)}
+    rel_strs = {rel:str(float(rel)) for panel in rels for rel in rels[panel]} # Legend label of each reliability
 
+    use_latex()
     for agent in agents:
         fig, ax = plt.subplots(ncols=len(panels),figsize=(4*len(panels),4.8))
         plot_dict = {}
         for i in range(len(panels)):
             panel = panels[i]
             for rel in rels[panel]:
-                rel_str = str(float(rel))
+                rel_str = rel_strs[rel]
                 print(agent+" : "+panel+" : "+rel_str+" : converged to "+str(rhos[agent][panel][rel][-1]))
                 ax[i].fill_between(x,rho_low[agent][panel][rel], rho_high[agent][panel][rel], alpha=0.2,color=colours[rel_str])
                 l, = ax[i].plot(rhos[agent][panel][rel],label=rel_str,color=colours[rel_str])
@@ -561,10 +972,10 @@ def plot_rhos(base_path,trials,accepted_panels=None,panel_titles=None):
         fig.subplots_adjust(bottom=bottom, wspace=wspace)
         plt.legend(handles = plot_list , labels=all_rels_str,loc='upper center',
                  bbox_to_anchor=(-wspace, -bottom/2),fancybox=False, shadow=False, ncol=max_num_rel)
-        plt.savefig(file_dir+agent+".png",dpi=256)
+        plt.savefig(file_dir+agent+".png",dpi=dpi)
         plt.close()
 
-def plot_rhos_individual(base_path,trials,accepted_panels=None,panel_titles=None):
+def plot_rhos_individual(base_path,trials,accepted_panels=None,panel_titles=None,dpi=256):
     path = "results/"+base_path
     fig_path = "figures/"+base_path
     rho_path = path+"rhos/"
@@ -593,23 +1004,23 @@ def plot_rhos_individual(base_path,trials,accepted_panels=None,panel_titles=None
         agent_labels.append(agent_names[agent])
 
     # Plot
-    x = np.arange(trials)
+    x = trial_axis(trials)
     file_dir = fig_path+"rho_comparison/"
     os.makedirs(os.path.dirname(file_dir), exist_ok=True)
 
+    use_latex()
     plt.rcParams["figure.figsize"] = (4,4.8)
 
-    c_map = plt.cm.get_cmap("tab20", len(all_rels))
-    colours = {}
-    for rel in all_rels_str:
-        colours[rel] = c_map(all_rels_str.index(rel))
+    c_map = plt.get_cmap("tab20", len(all_rels))
+    colours = {rel:c_map(i) for i,rel in enumerate(all_rels_str)}
+    rel_strs = {rel:str(float(rel)) for panel in rels for rel in rels[panel]} # Legend label of each reliability
     bottom = 0.5
     wspace = 0.45
 
     for agent in agents:
         for panel in panels:
             for rel in rels[panel]:
-                rel_str = str(float(rel))
+                rel_str = rel_strs[rel]
                 plt.fill_between(x,rho_low[agent][panel][rel], rho_high[agent][panel][rel], alpha=0.2,color=colours[rel_str])
                 plt.plot(rhos[agent][panel][rel],label=rel_str,color=colours[rel_str])
                 plt.xlabel("Trials")
@@ -620,10 +1031,10 @@ def plot_rhos_individual(base_path,trials,accepted_panels=None,panel_titles=None
                     plt.title(panel)
             plt.legend(labels=agent_labels,loc='upper center',
                      bbox_to_anchor=(-wspace, -bottom/2),fancybox=False, shadow=False, ncol=len(agents))
-            plt.savefig(file_dir+agent+"_"+panel+".png",dpi=256)
+            plt.savefig(file_dir+agent+"_"+panel+".png",dpi=dpi)
             plt.close()
 
-def plot_panel_comparison(base_path,trials,accepted_panels=None,panel_titles=None,reward_range=[None,None],fill=True):
+def plot_panel_comparison(base_path,trials,accepted_panels=None,panel_titles=None,reward_range=(None,None),fill=True,dpi=256):
     path = "results/"+base_path
     fig_path = "figures/"+base_path
     reward_path = path+"rewards/"
@@ -637,7 +1048,7 @@ def plot_panel_comparison(base_path,trials,accepted_panels=None,panel_titles=Non
 
 
     # Plot
-    x = np.arange(trials)
+    x = trial_axis(trials)
     file_dir = fig_path+"panel_comparison/"
 
     #print(reward_means)
@@ -648,6 +1059,7 @@ def plot_panel_comparison(base_path,trials,accepted_panels=None,panel_titles=Non
         if takes_advice[agent]:
             advice_agents.append(agent)
 
+    use_latex()
     fig, ax = plt.subplots(ncols=len(advice_agents),figsize=(4*len(advice_agents),4.8))
     plot_list = []
 
@@ -676,5 +1088,5 @@ def plot_panel_comparison(base_path,trials,accepted_panels=None,panel_titles=Non
     if not fill:
         name += "_nofill"
     name += ".png"
-    plt.savefig(name,dpi=256)
+    plt.savefig(name,dpi=dpi)
     plt.close()
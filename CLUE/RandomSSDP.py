@@ -76,18 +76,18 @@ class RandomSSDP(InfluenceDiagram):
         potential_parents = []
         for node in self.state_space:
             num_pars = np.random.randint(0,len(potential_parents)+1)
-            self.parents[node] = np.random.choice(potential_parents,num_pars,replace=False)
+            parent_ids = np.random.choice(len(potential_parents),num_pars,replace=False) # Positions, cheaper than choosing from the names
+            self.parents[node] = [potential_parents[i] for i in parent_ids]
             potential_parents.append(node)
 
         factor_dict = {}
         for node in list(self.state_space.keys()):
             num_pars = len(self.parents[node])
             num_prob_pairs = len(self.state_space[node])**num_pars
-            factor = []
-            for i in range(num_prob_pairs):
-                p1 = round(np.random.uniform(0,1),3) # Rounding to avoid floating point errors
-                factor.append(p1)
-                factor.append(round(1-p1,3))
+            p1 = np.round(np.random.random(num_prob_pairs),3) # Rounding to avoid floating point errors
+            factor = np.empty(2*num_prob_pairs)
+            factor[0::2] = p1
+            factor[1::2] = np.round(1-p1,3)
             factor_dict[node] = factor
 
         self.factors = {}
@@ -105,7 +105,9 @@ class RandomSSDP(InfluenceDiagram):
         Randomly assign parents to reward
         All decision variables are reward parents to ensure actions are meaningful
         '''
-        reward_parents = list(np.random.choice(list(self.state_space.keys()),num_pars,replace=False))+list(self.action_space.keys())
+        state_nodes = list(self.state_space.keys())
+        reward_parent_ids = np.random.choice(len(state_nodes),num_pars,replace=False)
+        reward_parents = [state_nodes[i] for i in reward_parent_ids]+list(self.action_space.keys())
         self.parents["reward"] = reward_parents
         reward_parent_vars = [self.variables[par] for par in reward_parents]
         utility = np.random.uniform(reward_range[0],reward_range[1],size=2**len(reward_parents))
@@ -1,4 +1,6 @@
 import numpy as np
+from itertools import compress
+from operator import itemgetter
 
 class StateTable:
     '''
@@ -25,14 +27,32 @@ class StateTable:
         for i in range(len(self.nodes)-1,-1,-1):
             self.offsets[self.nodes[i]]=self.size
             self.size *= len(self.domain[self.nodes[i]]) # Offset by size of domain
+        # Position of each value in its node's domain, so indexing needs no search through the domain
+        self.value_indices = {}
+        for node in self.nodes:
+            self.value_indices[node] = {value:i for i,value in enumerate(self.domain[node])}
+        self.assignments = None # Assignment of every index, listed on first use
+        # Each node's contribution to the index for each of its values, offsets already applied
+        self.node_terms = {}
+        for node in self.nodes:
+            self.node_terms[node] = {value:i*self.offsets[node] for value,i in self.value_indices[node].items()}
+        self.index_terms = list(self.node_terms.items())
+        # With only [False,True] domains an index is the sum of the offsets of the true nodes
+        self.binary = all(self.domain[node] == [False,True] for node in self.nodes)
+        if self.binary and len(self.nodes) > 1: # A single node's value is not returned as a tuple
+            # Node values pick out the offsets of the true nodes in C, like the bits of a binary number
+            self.node_values = itemgetter(*self.nodes)
+            self.true_offsets = [self.offsets[node] for node in self.nodes]
+        else:
+            self.true_offsets = None
         # Fill in values
-        self.values = []
         if random_init_vals is not None:
-            for i in range(self.size):
-                self.values.append(np.random.choice(random_init_vals))
+            self.values = np.random.choice(random_init_vals,self.size)
+        elif isinstance(default_value,(int,float)) and not isinstance(default_value,bool):
+            self.values = np.full(self.size,default_value,dtype=float) # Float, so counts and estimates can be updated in place
         else:
-            for i in range(self.size):
-                self.values.append(default_value)
+            self.values = np.empty(self.size,dtype=object) # Advice, actions and other objects
+            self.values.fill(default_value)
 
     def __str__(self):
         '''
@@ -65,10 +85,24 @@ class StateTable:
         Output:
             index - an int index corresponding to the assignment
         '''
-        index = 0
-        for node in self.nodes:
-            index += self.domain[node].index(assignment[node])*self.offsets[node]
-        return index
+        if self.true_offsets is not None:
+            return sum(compress(self.true_offsets,self.node_values(assignment)))
+        return sum([terms[assignment[node]] for node,terms in self.index_terms])
+
+    def partial_index(self,assignment):
+        '''
+        Takes in an assignment to some of the nodes, returns their part of the index
+        The index of a full assignment is the sum of the partial indices of any split of it
+
+        Input:
+            assignment - a dict mapping some node names to values in their domains
+
+        Output:
+            index - an int, the contribution of the assigned nodes to the index
+        '''
+        if self.binary:
+            return sum([self.offsets[node] for node,value in assignment.items() if value])
+        return sum([self.node_terms[node][value] for node,value in assignment.items()])
 
     def get_value(self,assignment):
         '''
@@ -85,6 +119,22 @@ class StateTable:
         '''
         Takes in an index, returns the corresponding assignment
 
+        Input:
+            index - an integer
+
+        Output:
+            assignment - a dict mapping node names to values in their domains
+        '''
+        if self.size > 4096: # Too large to list every assignment
+            return self.compute_assignment(index)
+        if self.assignments is None:
+            self.assignments = [self.compute_assignment(i) for i in range(self.size)]
+        return self.assignments[index].copy() # Copy, the caller may change it
+
+    def compute_assignment(self,index):
+        '''
+        Decodes an index into its assignment, one node at a time
+
         Input:
             index - an integer
 
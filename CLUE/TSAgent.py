@@ -44,10 +44,12 @@ class TSAgent(Agent):
             action - dict mapping action variable names to values
         '''
         samples,indices = self.sample(state)
-        vals = np.asarray(samples)
-        best_index = indices[np.argmax(np.random.random(vals.shape) * (vals==vals.max()))]
-        best_action = self.rewards.index_to_assignment(best_index)
-        return best_action
+        ties = np.flatnonzero(samples == samples.max()) # Almost always a single best sample
+        if len(ties) == 1:
+            best = ties[0]
+        else: # Break ties randomly
+            best = ties[np.random.randint(len(ties))]
+        return self.action_assignments[best].copy() # Copy, the caller may change it
 
 
     def learn(self,state,actions,reward):
@@ -59,45 +61,35 @@ class TSAgent(Agent):
             actions - a dict mapping action node names to values
             reward - the reward of this trial
         '''
-        assignment = {}
-        for node in state:
-            assignment[node] = state[node]
-        for node in actions:
-            assignment[node] = actions[node]
-        v = self.visits.get_value(assignment)
-        alpha = self.alphas.get_value(assignment) + 0.5
-        self.alphas.add_to_table(assignment,alpha)
-        beta = self.betas.get_value(assignment) + (v/(v+1))*(((reward-self.mu_0)**2)/2)
-        self.betas.add_to_table(assignment,beta)
+        index = self.indexer.partial_index(state) + self.indexer.partial_index(actions)
+        alpha,beta,reward_sum,mu,v = self.stats[index]
+        alpha = alpha + 0.5
+        beta = beta + (v/(v+1))*(((reward-self.mu_0)**2)/2)
 
         v_0 = beta/(alpha+1)
-        rewards = self.rewards.get_value(assignment).copy()
-        rewards.append(reward)
-        self.rewards.add_to_table(assignment,rewards)
-        self.visits.add_to_table(assignment,v+1)
-        self.mus.add_to_table(assignment,np.mean(rewards))
+        reward_sum = reward_sum + reward
+        mu = reward_sum/(v+1) # Mean reward, without keeping every reward
+        self.stats[index] = alpha,beta,reward_sum,mu,v+1
 
 
     def reset(self):
-        self.alphas = StateTable(self.domains,default_value=self.alpha_0)
-        self.betas = StateTable(self.domains,default_value=self.beta_0)
-        self.rewards = StateTable(self.domains,default_value=[])
-        self.mus = StateTable(self.domains,default_value=self.mu_0)
-        self.visits = StateTable(self.domains,default_value=0) # Reset visit counts
-
-    def sample(self,state):
-        samples = []
+        self.indexer = StateTable(self.domains) # Maps state-action assignments to rows of stats
+        # One row per state-action, with columns alpha, beta, reward sum, mu and visit count
+        self.stats = np.empty((self.indexer.size,5))
+        self.stats[:] = self.alpha_0,self.beta_0,0,self.mu_0,0
+        # Index offset of each possible action, so a state's action indices are its own index plus these
         combinations = list(product(*self.action_space.values())) # All possible actions
         keys = list(self.action_space.keys())
-        indices = []
-        for action in combinations:
-            assignment = state.copy()
-            for i in range(len(keys)):
-                assignment[keys[i]] = action[i]
-            indices.append(self.rewards.assignment_to_index(assignment))
-            tau = np.random.gamma(self.alphas.get_value(assignment),1/self.betas.get_value(assignment))
-            if tau == 0 or self.visits.get_value(assignment) == 0:
-                tau = 0.001
-            var = 1/tau
-            samples.append(np.random.normal(self.mus.get_value(assignment), np.sqrt(var)))
+        self.action_assignments = [dict(zip(keys,combination)) for combination in combinations]
+        self.action_indices = np.array([self.indexer.partial_index(action) for action in self.action_assignments],dtype=int)
+
+    def sample(self,state):
+        # Indices of every action for this state
+        indices = self.indexer.partial_index(state) + self.action_indices
+        alphas,betas,reward_sums,mus,visits = self.stats[indices].T
+        # Draw a precision and then a mean for all actions at once
+        # Scaling standard draws gives the same values as gamma and normal, without their parameter broadcasting
+        taus = np.random.standard_gamma(alphas)*(1/betas)
+        taus[(taus == 0) | (visits == 0)] = 0.001
+        samples = mus + np.sqrt(1/taus)*np.random.standard_normal(len(mus))
         return samples,indices
@@ -61,6 +61,28 @@ class TruePolicyAgent(Agent):
         for decision_function in self.policy:
             self.decision_functions[decision_function.dvar.name] = decision_function
 
+        # Expected utilities already computed, by state and action values
+        # The environment is fixed, so each state-action only needs to be evaluated once
+        self.utility_cache = {}
+
+        # Optimal actions already selected, by state values
+        # The policy is fixed, so each state only needs to be looked up once
+        self.action_cache = {}
+
+        # Flat lookup for each decision, indexed from the values of its state and decision parents
+        self.dense_policy = {}
+        for decision in self.decision_functions:
+            decision_function = self.decision_functions[decision]
+            state_terms = []
+            decision_terms = []
+            for var in decision_function.variables:
+                terms = {val:i*decision_function.var_offsets[var] for i,val in enumerate(var.domain)}
+                if var.name in env.action_space:
+                    decision_terms.append((var.name,terms))
+                else:
+                    state_terms.append((var.name,terms))
+            self.dense_policy[decision] = (state_terms,decision_terms,decision_function.values)
+
     def act(self,state):
         '''
         Select an action based on state
@@ -70,20 +92,31 @@ class TruePolicyAgent(Agent):
         Output:
             action - dict mapping action variable names to values
         '''
-        # Convert state to use variables as keys
-        state_vars = {}
-        for node in state:
-            state_vars[self.env.variables[node]] = state[node]
-
-        # Assign decision nodes
-        action = {}
-        running_state = state_vars.copy()
-        for decision in self.env.action_space:
-            decision_function = self.decision_functions[decision]
-            action[decision] = decision_function.get_value(running_state)
-            running_state[decision_function.dvar] = action[decision] # For inference
+        key = self.env.state_key(state)
+        action = self.action_cache.get(key)
+        if action is None:
+            # Assign decision nodes, earlier decisions can be parents of later ones
+            action = {}
+            for decision in self.env.action_space:
+                state_terms,decision_terms,values = self.dense_policy[decision]
+                index = sum([terms[state[node]] for node,terms in state_terms])
+                index += sum([terms[action[node]] for node,terms in decision_terms])
+                action[decision] = values[index]
+            self.action_cache[key] = action
         return action
 
+    def act_batch(self,states):
+        '''
+        Select an action for each state in a batch
+        Repeated states in the batch are only evaluated once
+
+        Input:
+            states - list of dicts mapping state variable names to values
+        Output:
+            actions - list of dicts mapping action variable names to values
+        '''
+        return [self.act(state) for state in states] # Repeated states are served from the action cache
+
     def expected_utility(self,state,action):
         '''
         Compute the expected reward of a given state-action pair
@@ -95,34 +128,70 @@ class TruePolicyAgent(Agent):
         Output:
             eu - the expected utility for state-action
         '''
-        # Convert state and action to use variables as keys
-        state_vars = {}
-        for node in self.env.state_space:
-            state_vars[self.env.variables[node]] = state[node]
-        for node in action:
-            state_vars[self.env.variables[node]] = action[node]
-
-        # Create Variable eliminator
-        gm_ve = PGM.VE(self.env.gm)
-        gm_ve.max_display_level = 0 # Variable eliminator unaware of reward
-        ve = PGM.VE(self.env.dn)
-        ve.max_display_level = 0 # Variable eliminator used to get reward factor
-        reward_fac = ve.gm.factors[-1] # Fetch reward factor
-        reward_fac = ve.project_observations(reward_fac,state_vars) # Project observations
-        # Calculate the probability of each remaining reward parent
-        probs = {}
-        for var in reward_fac.variables:
-            probs[var] = gm_ve.query(var,obs=state_vars)
-        # Calculate EU by Multiplying probability of each assignment by the reward
-        eu = 0
-        for i in range(reward_fac.size):
-            assignment = reward_fac.index_to_assignment(i)
-            assignment_prob = 1
-            for var in probs:
-                assignment_prob *= probs[var][assignment[var]]
-            eu += assignment_prob * reward_fac.get_value(assignment)
+        key = (self.env.state_key(state),self.env.action_key(action))
+        eu = self.utility_cache.get(key)
+        if eu is None:
+            eu = self.expected_utility_batch([state],[action])[0]
         return eu
 
+    def expected_utility_batch(self,states,actions):
+        '''
+        Compute the expected reward of each state-action pair in a batch
+        Pairs evaluated before are read from the cache. For the rest, the variable
+        eliminators are built once for the whole batch, and the reward parent
+        distributions are inferred once per distinct state
+
+        Input:
+            states - list of dicts mapping state variable names to values
+            actions - list of dicts mapping action variable names to values
+
+        Output:
+            eus - array of expected utilities, one per state-action pair
+        '''
+        eus = np.zeros(len(states))
+        gm_ve = None # Variable eliminators are only built if a pair is not cached
+        state_probs = {} # Maps state key to the joint probability table of the remaining reward parents
+        for i in range(len(states)):
+            state = states[i]
+            action = actions[i]
+            key = self.env.state_key(state)
+            pair_key = (key,self.env.action_key(action))
+            if pair_key in self.utility_cache:
+                eus[i] = self.utility_cache[pair_key]
+                continue
+            if gm_ve is None:
+                # Create Variable eliminator
+                gm_ve = PGM.VE(self.env.gm)
+                gm_ve.max_display_level = 0 # Variable eliminator unaware of reward
+                ve = PGM.VE(self.env.dn)
+                ve.max_display_level = 0 # Variable eliminator used to get reward factor
+                reward_fac = ve.gm.factors[-1] # Fetch reward factor
+                # Reward table with one axis per reward parent, so observations select a slice of it
+                reward_table = np.asarray(reward_fac.values,dtype=float).reshape([var.size for var in reward_fac.variables])
+            # Convert state and action to use variables as keys
+            state_vars = {}
+            for node in self.env.state_space:
+                state_vars[self.env.variables[node]] = state[node]
+            for node in action:
+                state_vars[self.env.variables[node]] = action[node]
+
+            # Project observations, leaving one axis for each remaining reward parent
+            observed = tuple(var.val_to_index[state_vars[var]] if var in state_vars else slice(None) for var in reward_fac.variables)
+            rewards = reward_table[observed]
+            # Calculate the joint probability of each assignment to the remaining reward parents
+            # Decisions are never parents of chance nodes, so these only depend on the state
+            if key not in state_probs:
+                joint = np.ones(())
+                for var in reward_fac.variables:
+                    if var not in state_vars:
+                        probs = gm_ve.query(var,obs=state_vars)
+                        joint = np.multiply.outer(joint,[probs[val] for val in var.domain])
+                state_probs[key] = joint
+            # Calculate EU by Multiplying probability of each assignment by the reward
+            eus[i] = np.sum(state_probs[key]*rewards)
+            self.utility_cache[pair_key] = eus.item(i) # Plain float, keeps the experts' running sums out of NumPy scalars
+        return eus
+
     def getEliminationOrder(self,parents,children,reward_ancestors):
         '''
         Order each node in the ID in order of elimination
@@ -130,7 +199,7 @@ class TruePolicyAgent(Agent):
         Input:
             parents - dict mapping node name to list of parent node names
             children - dict mapping node name to list of children node names
-            reward_ancestors - list of node names that are ancestors to the 'reward' node
+            reward_ancestors - set of node names that are ancestors to the 'reward' node
 
         Output:
             order - a list of node variables in order of elimination
@@ -182,7 +251,5 @@ class TruePolicyAgent(Agent):
                     nodes_left.remove(node)
                     added[node] = True
         # Remove nodes that aren't reward ancestors
-        for node in order:
-            if node.name not in reward_ancestors:
-                order.remove(node)
+        order = [node for node in order if node.name in reward_ancestors]
         return order
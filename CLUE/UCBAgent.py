@@ -33,6 +33,7 @@ class UCBAgent(Agent):
         # Parameters
         self.Q0 = Q0
         self.alpha = alpha
+        self.utility = None # Built on the first reset, then reset in place
         self.c = c
 
     def act(self,state,return_exploit=False):
@@ -49,14 +50,10 @@ class UCBAgent(Agent):
                 Only returned if return_exploit is True
         '''
         ucb_vals,utility_vals,indices = self.score_state(state,return_ucb=True) # Score each action for the state
-        best_index = indices[np.argmax(ucb_vals)] # Select the best scoring action index
-        best_action = self.utility.index_to_assignment(best_index) # Find corresponding action
-        action = {}
-        for node in self.action_space:
-            action[node] = best_action[node]
+        best = np.argmax(ucb_vals) # Select the best scoring action
+        action = self.action_assignments[best].copy() # Copy, the caller may change it
         if return_exploit:
-            optimal_index = indices[np.argmax(utility_vals)]
-            if optimal_index == best_index:
+            if np.argmax(utility_vals) == best:
                 # UCB chose the best action
                 return action,True
             else:
@@ -75,25 +72,28 @@ class UCBAgent(Agent):
         '''
         # Update trial count
         self.trial_count += 1
-        # Pack state, action and reward into a trial
-        trial = {}
-        for node in state:
-            trial[node] = state[node]
-        for node in actions:
-            trial[node] = actions[node]
-        trial["reward"] = reward
+        # Index of the state-action, shared by the utility and visit tables
+        index = self.visits.partial_index(state) + self.visits.partial_index(actions)
         # Update utility with trial
-        self.utility.update(trial)
+        self.utility.update_index(index,reward)
         # Update visit counts
-        self.visits.add_to_table(trial,self.visits.get_value(trial)+1)
+        self.visits.values[index] += 1
 
     def reset(self):
         '''
         Reset agent for a fresh run
         '''
         self.trial_count = 0
-        self.utility = Utility(self.domains,self.Q0,self.alpha) # Reset utility
+        if self.utility is None:
+            self.utility = Utility(self.domains,self.Q0,self.alpha)
+        else:
+            self.utility.reset(self.Q0) # Reset utility
         self.visits = StateTable(self.domains,default_value=1) # Reset visit counts
+        # Index offset of each possible action, so a state's action indices are its own index plus these
+        combinations = list(product(*self.action_space.values())) # All possible actions
+        keys = list(self.action_space.keys())
+        self.action_assignments = [dict(zip(keys,combination)) for combination in combinations]
+        self.action_indices = np.array([self.visits.partial_index(action) for action in self.action_assignments],dtype=int)
 
     def score_state(self,state,return_ucb=False):
         '''
@@ -104,29 +104,18 @@ class UCBAgent(Agent):
             return_ucb - bool. If True, will return UCB score as well as utility score
                 default: False
         Output:
-            ucb_vals - list of UCB values (i.e. Q(s,a) + c sqrt(log(t)/N(s,a)) for each a)
+            ucb_vals - array of UCB values (i.e. Q(s,a) + c sqrt(log(t)/N(s,a)) for each a)
                 Only returned if return_ucb is True
-            utility_vals - list of utility values (i.e. Q(s,a) for each a)
-            indices - list of indices corresponding to each value
+            utility_vals - array of utility values (i.e. Q(s,a) for each a)
+            indices - array of indices corresponding to each value
         '''
-        combinations = list(product(*self.action_space.values())) # All possible actions
-        keys = list(self.action_space.keys())
-        indices = []
         # Get all indices
-        for combo in combinations:
-            state_copy = state.copy()
-            for i in range(len(keys)):
-                state_copy[keys[i]] = combo[i]
-            indices.append(self.utility.assignment_to_index(state_copy))
+        indices = self.visits.partial_index(state) + self.action_indices
         # Get all values
-        ucb_vals = []
-        utility_vals = []
-        for index in indices:
-            exploit_term = self.utility.values[index]
-            utility_vals.append(exploit_term)
-            explore_term = self.c*(np.sqrt(2*np.log(self.trial_count+1)/(self.visits.values[index])))
-            score = exploit_term + explore_term
-            ucb_vals.append(score)
+        utility_vals = self.utility.values[indices]
         if return_ucb:
+            explore_scale = self.c*np.sqrt(2*np.log(self.trial_count+1)) # Same for every action
+            explore_terms = explore_scale/np.sqrt(self.visits.values[indices])
+            ucb_vals = utility_vals + explore_terms
             return ucb_vals,utility_vals,indices
         return utility_vals,indices
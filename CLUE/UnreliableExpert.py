@@ -36,6 +36,7 @@ class UnreliableExpert(Expert):
 
         # Table for all possible actions
         self.action_table = StateTable(self.env.action_space)
+        self.action_assignments = [self.action_table.index_to_assignment(i) for i in range(self.action_table.size)]
 
     def advise(self,state,optimal_action=None):
         '''
@@ -54,16 +55,15 @@ class UnreliableExpert(Expert):
         if optimal_action is None:
             optimal_action = self.oracle.act(state) # Get best action to advise
         # Choose whether or not to give optimal advice this trial
-        is_correct = np.random.choice([True,False],p=[self.rho,1-self.rho])
+        is_correct = np.random.random() < self.rho
         if is_correct: # Give correct advice
             return optimal_action
         else: # Give incorrect advice (any advice except optimal action)
             optimal_index = self.action_table.assignment_to_index(optimal_action) # Optimal index
-            indices = list(np.arange(self.action_table.size)) # Fetch all indices
-            indices.remove(optimal_index) # Remove optimal index
-            index = np.random.choice(indices) # Choose suboptimal index
-            suboptimal_action = self.action_table.index_to_assignment(index) # Get corresponding action
-            return suboptimal_action
+            index = np.random.randint(self.action_table.size-1) # Choose among all indices but one
+            if index >= optimal_index:
+                index += 1 # Skip over optimal index
+            return self.action_assignments[index] # Get corresponding action
 
     def deliberate(self,state,action,reward):
         '''
@@ -74,6 +74,28 @@ class UnreliableExpert(Expert):
             action - dict mapping decision node names to domain value
             reward - the reward obtained this trial
 
+        Output:
+            advice_given - True if advice is given, false otherwise
+            advice - dict mapping decision node names to domain value if advice_given is True, None otherwise
+        '''
+        optimal_action = self.oracle.act(state) # Get optimal action
+        optimal_utility = self.oracle.expected_utility(state,optimal_action) # Get expected utility of optimal action
+        if action == optimal_action: # Agent acted optimally, no need to evaluate its action
+            agent_utility = optimal_utility
+        else:
+            agent_utility = self.oracle.expected_utility(state,action) # Get expected utility of the agent's action
+        return self.deliberate_precomputed(state,optimal_action,optimal_utility,agent_utility)
+
+    def deliberate_precomputed(self,state,optimal_action,optimal_utility,agent_utility):
+        '''
+        Decide whether or not to give advice for this trial, given the oracle's evaluation of it
+
+        Input:
+            state - dict mapping node name to domain value of pre state chance nodes
+            optimal_action - dict mapping decision node names to domain value of the optimal action
+            optimal_utility - expected utility of the optimal action
+            agent_utility - expected utility of the agent's action
+
         Output:
             advice_given - True if advice is given, false otherwise
             advice - dict mapping decision node names to domain value if advice_given is True, None otherwise
@@ -82,9 +104,6 @@ class UnreliableExpert(Expert):
         self.curr_trial += 1 # Increment trial counter
 
         # Update utility sums
-        optimal_action = self.oracle.act(state) # Get optimal action
-        optimal_utility = self.get_utility(state,optimal_action) # Get expected utility of optimal action
-        agent_utility = self.get_utility(state,action) # Get expected utility of the agent's action
         self.optimal_utility_sum += optimal_utility # Add expected utility to running sum
         self.agent_utility_sum += agent_utility # Add expected utility to running sum
 
@@ -105,20 +124,6 @@ class UnreliableExpert(Expert):
         advised_action = self.advise(state,optimal_action=optimal_action) # Choose an action to advise
         return True,advised_action
 
-    def get_utility(self,state,action):
-        '''
-        Returns the expected utility of a given state, action pair
-
-        Input:
-            state - dict mapping state node name to domain value
-            action - dict mapping action node names to domain value
-
-        Output:
-            expected_utility - the expected utility of the state, action pair
-        '''
-        return self.oracle.expected_utility(state,action)
-
-
     def reset(self):
         '''
         Resets the expert for a fresh run
@@ -1,4 +1,6 @@
 import numpy as np
+from itertools import compress
+from operator import itemgetter
 
 class Utility:
     '''
@@ -23,25 +25,38 @@ class Utility:
         for i in range(len(self.nodes)-1,-1,-1):
             self.offsets[self.nodes[i]]=self.size
             self.size *= len(self.domains[self.nodes[i]]) # Offset by size of domain
+        self.assignments = None # Assignment of every index, listed on first use
+        # Each node's contribution to the index for each of its values, offsets already applied
+        self.node_terms = {}
+        for node in self.nodes:
+            self.node_terms[node] = {value:i*self.offsets[node] for i,value in enumerate(self.domains[node])}
+        self.index_terms = list(self.node_terms.items())
+        # With only [False,True] domains an index is the sum of the offsets of the true nodes
+        self.binary = all(self.domains[node] == [False,True] for node in self.nodes)
+        if self.binary and len(self.nodes) > 1: # A single node's value is not returned as a tuple
+            # Node values pick out the offsets of the true nodes in C, like the bits of a binary number
+            self.node_values = itemgetter(*self.nodes)
+            self.true_offsets = [self.offsets[node] for node in self.nodes]
+        else:
+            self.true_offsets = None
 
         # Set up initial values
         if isinstance(Q0,(int,float)): # is a single number
-            self.values = np.ones(self.size) * Q0
+            self.values = np.full(self.size,Q0,dtype=float)
         elif isinstance(Q0,(list,np.ndarray)): # is an array-like
-            if isinstance(Q0,list):
-                Q0_size = len(Q0)
-            else:
-                Q0_size = Q0.size
-            if Q0_size != self.size:
-                error_message = "Size of Q0 does not match state-action space size ("+str(Q0_size)+" != "+str(self.size)+")!"
+            values = np.ascontiguousarray(Q0,dtype=float) # Array, so entries can be read with item
+            if values.size != self.size:
+                error_message = "Size of Q0 does not match state-action space size ("+str(values.size)+" != "+str(self.size)+")!"
                 raise Exception(error_message)
-            else:
-                self.values = Q0
+            self.values = values
+        else:
+            error_message = "Invalid Q0: "+str(Q0)
+            raise Exception(error_message)
 
         # Set up learning rate
         if alpha is None:
             self.count_based = True
-            self.counts = np.zeros(self.size)
+            self.counts = np.zeros(self.size,dtype=np.int64) # Only ever incremented, so kept as ints
         elif isinstance(alpha,(int,float)):
             self.count_based = False
             self.alpha = alpha
@@ -53,10 +68,12 @@ class Utility:
         '''
         Display utility function
         '''
-        text = ""
-        for i in range(self.size):
-            text += str(self.index_to_assignment(i)) + " : " + str(self.values[i]) + "\n"
-        return text
+        # Position in each node's domain of every index, decoded for all indices at once
+        positions = np.unravel_index(np.arange(self.size),[len(self.domains[node]) for node in self.nodes])
+        columns = [[self.domains[node][j] for j in node_positions.tolist()] for node,node_positions in zip(self.nodes,positions)]
+        nodes = self.nodes[::-1] # Same key order as index_to_assignment, which decodes the last node first
+        lines = [str(dict(zip(nodes,row))) + " : " + str(value) for row,value in zip(zip(*columns[::-1]),self.values.tolist())]
+        return "\n".join(lines) + "\n"
 
     def assignment_to_index(self,assignment):
         '''
@@ -68,10 +85,24 @@ class Utility:
         Output:
             index - an int index corresponding to the assignment
         '''
-        index = 0
-        for node in self.nodes:
-            index += self.domains[node].index(assignment[node])*self.offsets[node]
-        return index
+        if self.true_offsets is not None:
+            return sum(compress(self.true_offsets,self.node_values(assignment)))
+        return sum([terms[assignment[node]] for node,terms in self.index_terms])
+
+    def partial_index(self,assignment):
+        '''
+        Takes in an assignment to some of the nodes, returns their part of the index
+        The index of a full assignment is the sum of the partial indices of any split of it
+
+        Input:
+            assignment - a dict mapping some node names to values in their domains
+
+        Output:
+            index - an int, the contribution of the assigned nodes to the index
+        '''
+        if self.binary:
+            return sum([self.offsets[node] for node,value in assignment.items() if value])
+        return sum([self.node_terms[node][value] for node,value in assignment.items()])
 
     def get_value(self,assignment):
         '''
@@ -88,6 +119,22 @@ class Utility:
         '''
         Takes in an index, returns the corresponding assignment
 
+        Input:
+            index - an integer
+
+        Output:
+            assignment - a dict mapping node names to values in their domains
+        '''
+        if self.size > 4096: # Too large to list every assignment
+            return self.compute_assignment(index)
+        if self.assignments is None:
+            self.assignments = [self.compute_assignment(i) for i in range(self.size)]
+        return self.assignments[index].copy() # Copy, the caller may change it
+
+    def compute_assignment(self,index):
+        '''
+        Decodes an index into its assignment, one node at a time
+
         Input:
             index - an integer
 
@@ -100,6 +147,17 @@ class Utility:
             index = index // len(self.domains[self.nodes[i]])
         return assignment
 
+    def reset(self,Q0=0):
+        '''
+        Resets the table in place for a fresh run, rather than building a new one
+
+        Input:
+            Q0 - initial Q value. Can be real number or array of appropriate size
+        '''
+        self.values[:] = Q0
+        if self.count_based:
+            self.counts.fill(0)
+
     def update(self,trial):
         '''
         Update utility based on latest trial
@@ -107,10 +165,22 @@ class Utility:
         Input:
             trial - dict mapping node names (including reward) to values
         '''
-        index = self.assignment_to_index(trial)
+        self.update_index(self.assignment_to_index(trial),trial["reward"])
+
+    def update_index(self,index,reward):
+        '''
+        Update utility based on latest trial, given the index of its assignment
+
+        Input:
+            index - the int index of the trial's state-action assignment
+            reward - the reward of the trial
+        '''
+        # Plain floats via item, much cheaper than NumPy scalars for a single entry
         if self.count_based:
-            self.counts[index] += 1
-            alpha = 1/self.counts[index]
+            count = self.counts.item(index) + 1
+            self.counts[index] = count
+            alpha = 1/count
         else:
             alpha = self.alpha
-        self.values[index] = self.values[index] + alpha*(trial["reward"]-self.values[index])
+        value = self.values.item(index)
+        self.values[index] = value + alpha*(reward-value)
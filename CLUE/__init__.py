@@ -1,51 +1,83 @@
 '''
 Creates the CLUE_SSDP module
+Classes and helper modules are imported on first access (see __getattr__),
+so scripts only pay for the parts of the module they use
 '''
 
 import sys
 import os
+import importlib
 sys.path.append(os.path.join(os.path.dirname(__file__)))
 
+# Classes, each defined in a file of the same name
+classes = [
 # Environments
-from InfluenceDiagram import InfluenceDiagram
-from RandomSSDP import RandomSSDP
-
+"InfluenceDiagram",
+"RandomSSDP",
 # Agents
-from Agent import Agent
-from TruePolicyAgent import TruePolicyAgent
-from BaselineAgent import BaselineAgent
-from NaiveAdviceFollower import NaiveAdviceFollower
-from ClueAgent import ClueAgent
-from NonuniformClueAgent import NonuniformClueAgent
-from DecayedRelianceAgent import DecayedRelianceAgent
-from BestCaseClueAgent import BestCaseClueAgent
-from PRQAgent import PRQAgent
-from LinUCBAgent import LinUCBAgent
-from UCBAgent import UCBAgent
-from TSAgent import TSAgent
-from AdaptiveGreedyAgent import AdaptiveGreedyAgent
-from ETEAgent import ETEAgent
-
+"Agent",
+"TruePolicyAgent",
+"BaselineAgent",
+"NaiveAdviceFollower",
+"ClueAgent",
+"NonuniformClueAgent",
+"DecayedRelianceAgent",
+"BestCaseClueAgent",
+"PRQAgent",
+"LinUCBAgent",
+"UCBAgent",
+"TSAgent",
+"AdaptiveGreedyAgent",
+"ETEAgent",
 # Experts
-from Expert import Expert
-from UnreliableExpert import UnreliableExpert
-from NonuniformUnreliableExpert import NonuniformUnreliableExpert
-from PartiallyReliableExpert import PartiallyReliableExpert
-from DegradingExpert import DegradingExpert
-from Panel import Panel
-from NonuniformPanel import NonuniformPanel
-
+"Expert",
+"UnreliableExpert",
+"NonuniformUnreliableExpert",
+"PartiallyReliableExpert",
+"DegradingExpert",
+"Panel",
+"NonuniformPanel",
 # Helpers
-from Utility import Utility
-from StateTable import StateTable
-import Experiment
-import Plot
+"Utility",
+"StateTable"
+]
 
-# Environment keys
+# Helper modules
+modules = [
+"Experiment",
+"Plot"
+]
+
+# Environment keys, mapping to class names
 envs = {
-"RandomSSDP":RandomSSDP
+"RandomSSDP":"RandomSSDP"
 }
 
+def __getattr__(name):
+    '''
+    Imports a class or helper module the first time it is accessed
+
+    Input:
+        name - name of the class or module
+    Output:
+        value - the class or module
+    '''
+    if name in classes:
+        value = getattr(importlib.import_module(name),name)
+    elif name in modules:
+        value = importlib.import_module(name)
+    else:
+        error_message = "module 'CLUE' has no attribute '"+name+"'"
+        raise AttributeError(error_message)
+    globals()[name] = value # Later accesses skip __getattr__
+    return value
+
+def __dir__():
+    '''
+    Lists the module's attributes, including those not yet imported
+    '''
+    return sorted(set(globals()) | set(classes) | set(modules))
+
 def make(name,**kwargs):
     """
     Creates a single stage decision problem environment
@@ -62,5 +94,5 @@ def make(name,**kwargs):
     if name not in envs:
         error_message = name+" not recognised!"
     else:
-        return envs[name](**kwargs)
+        return __getattr__(envs[name])(**kwargs)
     raise Exception(error_message)
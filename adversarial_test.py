@@ -1,5 +1,6 @@
 import CLUE
 import numpy as np
+import os
 
 '''
 This script runs the adversarial test
@@ -14,6 +15,8 @@ trials = 80000
 # Number of runs
 runs = 100
 #runs = 10
+# Number of worker processes the runs are spread across
+processes = os.cpu_count()
 # List of agents
 agent_list = ["True Policy Agent","Baseline Agent","NAF","CLUE"]
 
@@ -35,10 +38,10 @@ RUN EXPERIMENT
 '''
 # Run the panel comparison experiment
 print("======Running experiment======")
-rewards,rhos = CLUE.Experiment.panel_comparison_random_envs(agent_list,panel_dict,trials,runs,display=True,display_interval=2,num_chance=num_chance,num_decision=num_decision,threshold=0.25)
-# Save results to csv
+rewards,rhos = CLUE.Experiment.panel_comparison_random_envs(agent_list,panel_dict,trials,runs,display=True,display_interval=2,num_chance=num_chance,num_decision=num_decision,threshold=0.25,processes=processes)
+# Save results to npz
 print("======Saving results======")
-CLUE.Experiment.save_panel_comparison_random_envs_to_csv(rewards,rhos,num_chance,num_decision,agent_list,panel_dict,trials,runs,directory=exp_name)
+CLUE.Experiment.save_panel_comparison_random_envs_to_npz(rewards,rhos,num_chance,num_decision,agent_list,panel_dict,trials,runs,directory=exp_name)
 '''
 PLOT RESULTS
 '''
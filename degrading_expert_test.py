@@ -50,9 +50,9 @@ RUN EXPERIMENT
 # Run the panel comparison experiment
 print("======Running experiment======")
 rewards,rhos = CLUE.Experiment.panel_comparison(env,agents,panels,trials,runs,display=True)
-# Save results to csv
+# Save results to npz
 print("======Saving results======")
-CLUE.Experiment.save_panel_comparison_to_csv(rewards,rhos,env.name,agents,panels,trials,runs,directory=experiment_name)
+CLUE.Experiment.save_panel_comparison_to_npz(rewards,rhos,env.name,agents,panels,trials,runs,directory=experiment_name)
 '''
 PLOT RESULTS
 '''
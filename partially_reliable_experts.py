@@ -38,7 +38,7 @@ print("======Running experiment======")
 rewards,rhos = CLUE.Experiment.panel_comparison_partially_reliable_experts(env,agent_list,panel_dict,trials,runs,display=True,display_interval=1)
 
 print("======Saving results======")
-CLUE.Experiment.save_panel_comparison_random_envs_to_csv(rewards,rhos,7,3,agent_list,panel_dict,trials,runs,directory=exp_name)
+CLUE.Experiment.save_panel_comparison_random_envs_to_npz(rewards,rhos,7,3,agent_list,panel_dict,trials,runs,directory=exp_name)
 
 '''
 PLOT RESULTS
@@ -2,7 +2,7 @@ import CLUE
 import numpy as np
 
 '''
-This script plots a panel comparison experiment from csvs
+This script plots a panel comparison experiment from saved results (npz or csv)
 Use this if you are running experiments and plotting separately
 '''
 